@@ -0,0 +1,76 @@
+import numpy as np
+from columns import ColumnStore
+
+class BattleRecorder(ColumnStore):
+    """
+    Records the outcome of every battle of a simulation run: win and loss
+    counters, and one columnar record per battle.
+
+    Battles are rows of a ColumnStore, so recording one does not allocate once
+    the run has warmed up, and each column can be read as `recorder.<column>`,
+    with one value per battle.
+
+    Attributes:
+        attack_wins (int): Attacks on the enemy nation that were won.
+        attack_losts (int): Attacks on the enemy nation that were lost.
+        defense_wins (int): Enemy attacks that were defended.
+        defense_losts (int): Enemy attacks that were not defended.
+
+    Methods:
+        record(tick, attack, won, units_lost, food, gold): Add a battle.
+        to_array(): Get the records as an array of shape (columns, battles).
+        to_dict(): Get the records keyed by column.
+        save(path): Save the records to a .npz file.
+    """
+    COLUMNS = (
+        "tick",
+        "attack",  # 1 for attacks on the enemy nation, 0 for enemy attacks.
+        "won",
+        "units_lost",
+        "food",  # Food looted, or lost when negative.
+        "gold",  # Gold looted, or lost when negative.
+    )
+    INITIAL_CAPACITY = 64
+
+    def __init__(self):
+        super().__init__(self.INITIAL_CAPACITY)
+        self.attack_wins = 0
+        self.attack_losts = 0
+        self.defense_wins = 0
+        self.defense_losts = 0
+
+    def record(self, tick: int, attack: bool, won: bool, units_lost: int, food: float = 0, gold: float = 0):
+        """
+        Adds a battle to the records and counters.
+
+        Args:
+            tick (int): Tick the battle was resolved in.
+            attack (bool): Whether the nation attacked, or defended from an enemy attack.
+            won (bool): Whether the nation won the battle.
+            units_lost (int): Units the nation lost.
+            food (float): Food the nation looted, or lost when negative.
+            gold (float): Gold the nation looted, or lost when negative.
+        """
+        if attack:
+            if won:
+                self.attack_wins += 1
+            else:
+                self.attack_losts += 1
+        elif won:
+            self.defense_wins += 1
+        else:
+            self.defense_losts += 1
+        if self._length == len(self._data):
+            self._grow()
+        self._data[self._length] = (tick, attack, won, units_lost, food, gold)
+        self._length += 1
+
+    def to_dict(self) -> dict:
+        """
+        Returns:
+            dict[str, np.ndarray]: The records, one array per column.
+        """
+        return dict(zip(self.COLUMNS, self.to_array()))
+
+    def save(self, path: str):
+        np.savez(path, **self.to_dict())
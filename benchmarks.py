@@ -0,0 +1,274 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+import events
+from entities import AnimalFactory, BuildingFactory, animal_types, building_types
+from eventlog import event_log
+from profiling import EventProfiler
+
+def _slot_names(cls) -> list:
+    names = []
+    for klass in reversed(cls.__mro__):
+        names.extend(klass.__dict__.get("__slots__", ()))
+    return names
+
+def _unslotted(cls):
+    """
+    Copy of `cls` and of all its bases without __slots__, so that its instances
+    keep their attributes in a per-instance __dict__, which is how the classes
+    were laid out before they declared __slots__.
+    """
+    if cls is object:
+        return object
+    slots = cls.__dict__.get("__slots__", ())
+    slots = (slots,) if isinstance(slots, str) else tuple(slots)
+    namespace = {
+        name: value for name, value in cls.__dict__.items()
+        if name not in ("__slots__", "__dict__", "__weakref__") and name not in slots
+    }
+    return type(cls.__name__, tuple(_unslotted(base) for base in cls.__bases__), namespace)
+
+def _populated(cls, names):
+    obj = cls.__new__(cls)
+    for name in names:
+        setattr(obj, name, None)
+    return obj
+
+def _bytes_per_object(factory, count: int) -> float:
+    objects = [None] * count
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(count):
+        objects[i] = factory()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / count
+
+def object_memory_report(count: int = 10000) -> list:
+    """
+    Measures the bytes allocated per object for events, buildings and animal
+    spawns, with a per-instance __dict__ (before) and with __slots__ and
+    flyweight animals (after).
+
+    Args:
+        count (int): Objects allocated per measure.
+
+    Returns:
+        list[dict]: One row per class, with "object", "before" and "after" bytes.
+    """
+    rows = []
+    event_classes = [
+        cls for cls in vars(events).values()
+        if isinstance(cls, type) and issubclass(cls, events.Event) and cls is not events.Event
+    ]
+    for cls in event_classes:
+        names = _slot_names(cls)
+        unslotted = _unslotted(cls)
+        before = _bytes_per_object(lambda: _populated(unslotted, names), count)
+        after = _bytes_per_object(lambda: _populated(cls, names), count)
+        rows.append({"object": cls.__name__, "before": before, "after": after})
+
+    for building_type in building_types:
+        cls = type(BuildingFactory().create(building_type))
+        unslotted = _unslotted(cls)
+        rows.append({
+            "object": f"{cls.__name__}({building_type})",
+            "before": _bytes_per_object(lambda: unslotted(building_type), count),
+            "after": _bytes_per_object(lambda: cls(building_type), count),
+        })
+
+    for animal_name in animal_types:
+        cls = type(AnimalFactory().create(animal_name))
+        unslotted = _unslotted(cls)
+        rows.append({
+            "object": f"{animal_name} spawn",
+            "before": _bytes_per_object(unslotted, count),
+            "after": _bytes_per_object(lambda: AnimalFactory().create(animal_name), count),
+        })
+    return rows
+
+def print_memory_report(count: int = 10000):
+    print(f"{'Object':<32}{'Before (bytes)':>16}{'After (bytes)':>16}")
+    for row in object_memory_report(count):
+        print(f"{row['object']:<32}{row['before']:>16.1f}{row['after']:>16.1f}")
+
+def _idle(models):
+    return []
+
+def _build_heavy(models):
+    nation, resources, combat, research_and_dev, enemy_nation = models
+    resources.gold_count = resources.food_count = 10 ** 12
+    nation.population_count = 10 ** 9
+    research_and_dev.max_building_improvements = 10 ** 9
+    return [
+        ("BuildBuilding", "Gold"), ("BuildBuilding", "Food"), ("BuildBuilding", "House"),
+        ("ImproveBuilding", "Gold"), ("ImproveBuilding", "Food"), "BuildRoad", "MineGold",
+    ]
+
+def _combat_heavy(models):
+    nation, resources, combat, research_and_dev, enemy_nation = models
+    # Attacks are won, so every win takes a random share of the units instead
+    # of all of them and the troops last for a few dozen attacks.
+    combat.attack_force_rate = 1.0
+    combat.attack_units_count = combat.defense_units_count = 2 ** 62
+    return ["AttackEnemies"]
+
+# name: (ticks, fast forward, setup). A setup adjusts the models loaded from
+# the YAML file and returns the actions issued on every tick.
+SCENARIOS = {
+    "idle": (20000, False, _idle),
+    "build-heavy": (20000, False, _build_heavy),
+    "combat-heavy": (20000, False, _combat_heavy),
+    "long-run": (10 ** 6, True, _idle),
+}
+PROFILED_TICKS = 20000
+
+def _build_simulation(name: str, models_path: str, seed: int, ticks: int, profiler=None):
+    from config import load_config
+    from simulation import Simulation
+
+    models = load_config(models_path).build()
+    every_tick = SCENARIOS[name][2](models)
+    start = models[0].current_time
+    actions = {start + tick: every_tick for tick in range(ticks)} if every_tick else {}
+    simulation = Simulation(*models, seed=seed, profiler=profiler)
+    return simulation, actions
+
+def run_scenario(name: str, models_path: str = 'models.yml', seed: int = 0, ticks: int = None) -> dict:
+    """
+    Runs a benchmark scenario headless and measures it.
+
+    The throughput is measured on a plain run. The cost of the events' `tick()`
+    is measured on a second run of at most PROFILED_TICKS ticks with an
+    EventProfiler, so the timers do not slow down the first one.
+
+    Args:
+        name (str): Key of SCENARIOS.
+        models_path (str): YAML file with the models' data.
+        seed (int): Seed of both runs.
+        ticks (int): Ticks to run, defaults to the ticks of the scenario.
+
+    Returns:
+        dict: The measures of the scenario.
+    """
+    default_ticks, fast_forward, _ = SCENARIOS[name]
+    ticks = ticks or default_ticks
+    with event_log.silenced(), open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        simulation, actions = _build_simulation(name, models_path, seed, ticks)
+        start = time.perf_counter()
+        rejected = simulation.run_batch(ticks, actions, fast_forward=fast_forward)
+        elapsed = time.perf_counter() - start
+        stats_cache_bytes = simulation.stats_cache.nbytes
+        peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        profiled_ticks = min(ticks, PROFILED_TICKS)
+        profiler = EventProfiler()
+        simulation, actions = _build_simulation(name, models_path, seed, profiled_ticks, profiler)
+        simulation.run_batch(profiled_ticks, actions, fast_forward=fast_forward)
+    profile = profiler.to_dict()
+    return {
+        "ticks": ticks,
+        "fast_forward": fast_forward,
+        "seconds": elapsed,
+        "ticks_per_second": ticks / elapsed,
+        "rejected_actions": len(rejected),
+        "peak_rss_bytes": peak_rss_kb * 1024,
+        "stats_cache_bytes": stats_cache_bytes,
+        "profiled_ticks": profiled_ticks,
+        "events": profile["events"],
+        "max_queue_length": max(profile["queue"]["lengths"], default=0),
+    }
+
+# Directory of the engine's modules, where the subprocesses run.
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# A worker process imports the engine before it runs its first tick.
+STARTUP_MODULE = "ensemble"
+STARTUP_TARGET_SECONDS = 0.15
+
+def startup_time(module: str = STARTUP_MODULE, runs: int = 5) -> dict:
+    """
+    Measures how long a fresh interpreter takes to import `module`, as a worker
+    of a process pool does, and compares it with STARTUP_TARGET_SECONDS.
+
+    Args:
+        module (str): Module imported.
+        runs (int): Interpreters started, the median is reported.
+
+    Returns:
+        dict: The "module", the median and max "seconds" and the target.
+    """
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    times = sorted(
+        float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=ROOT).stdout)
+        for _ in range(runs)
+    )
+    return {
+        "module": module,
+        "seconds": times[len(times) // 2],
+        "max_seconds": times[-1],
+        "target_seconds": STARTUP_TARGET_SECONDS,
+        "within_target": times[len(times) // 2] <= STARTUP_TARGET_SECONDS,
+    }
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True, cwd=ROOT).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(scenarios=None, models_path: str = 'models.yml', seed: int = 0, ticks: int = None,
+                   output: str = 'benchmark_results.json') -> dict:
+    """
+    Runs the benchmark scenarios, each one in a fresh process so that its peak
+    RSS is not inflated by the previous ones, and writes the results to JSON.
+
+    Args:
+        scenarios (list[str]): Keys of SCENARIOS to run, defaults to all of them.
+        models_path (str): YAML file with the models' data.
+        seed (int): Seed of the runs.
+        ticks (int): Ticks of every scenario, defaults to each scenario's own.
+        output (str): JSON file where the results are written, or None.
+
+    Returns:
+        dict: The results, keyed by scenario under "scenarios".
+    """
+    results = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "models": models_path,
+        "seed": seed,
+        "startup": startup_time(),
+        "scenarios": {},
+    }
+    context = multiprocessing.get_context("spawn")
+    for name in scenarios or SCENARIOS:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            results["scenarios"][name] = executor.submit(run_scenario, name, models_path, seed, ticks).result()
+    if output:
+        with open(output, 'w') as file:
+            json.dump(results, file, indent=2)
+    return results
+
+def print_benchmarks(results: dict):
+    startup = results["startup"]
+    print(f"Import of {startup['module']} in a fresh interpreter: {startup['seconds'] * 1000:.0f} ms "
+          f"(target {startup['target_seconds'] * 1000:.0f} ms{'' if startup['within_target'] else ', EXCEEDED'})")
+    print(f"{'Scenario':<16}{'Ticks':>10}{'Ticks/s':>12}{'Peak RSS (MB)':>16}{'StatsCache (MB)':>18}")
+    for name, scenario in results["scenarios"].items():
+        print(f"{name:<16}{scenario['ticks']:>10}{scenario['ticks_per_second']:>12.0f}"
+              f"{scenario['peak_rss_bytes'] / 2 ** 20:>16.1f}{scenario['stats_cache_bytes'] / 2 ** 20:>18.1f}")
+        for event, stats in scenario["events"].items():
+            print(f"    {event:<28}{stats['calls']:>10} calls{stats['mean_seconds'] * 1e6:>10.2f} us/call"
+                  f"{stats['max_seconds'] * 1e6:>10.1f} us max")
+
+if __name__ == "__main__":
+    print_memory_report()
@@ -0,0 +1,67 @@
+import numpy as np
+
+class ColumnStore:
+    """
+    Base of the recorders that keep rows of float64 values with named
+    columns, like StatsCache and BattleRecorder.
+
+    Rows are written to a preallocated array that doubles its capacity when
+    it gets full, so recording a row does not allocate once the recorder has
+    warmed up. Each column can be read as `recorder.<column>`, which returns
+    one value per recorded row.
+
+    Subclasses set COLUMNS, and ROW_ARRAYS when they keep other arrays with
+    one entry per row: it maps the name of every such array to the value its
+    free capacity is filled with.
+
+    Methods:
+        to_array: Returns the recorded rows as an array of shape (columns, rows).
+    """
+    COLUMNS = ()
+    ROW_ARRAYS = {"_data": 0}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._column_index = {name: index for index, name in enumerate(cls.COLUMNS)}
+
+    def __init__(self, capacity: int):
+        self._data = np.zeros((max(1, capacity), len(self.COLUMNS)), dtype=np.float64)
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getattr__(self, name):
+        try:
+            index = type(self)._column_index[name]
+        except KeyError:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'") from None
+        return self._column(index)
+
+    def _column(self, index: int) -> np.ndarray:
+        return self._data[:self._length, index]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # Only the recorded rows, not the free capacity.
+        for name in self.ROW_ARRAYS:
+            state[name] = state[name][:self._length]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def _grow(self):
+        capacity = max(1, len(self._data) * 2)
+        for name, fill in self.ROW_ARRAYS.items():
+            array = self.__dict__[name]
+            grown = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+            grown[:self._length] = array[:self._length]
+            self.__dict__[name] = grown
+
+    def to_array(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: The recorded rows, shape (len(COLUMNS), rows), a view of the recorder.
+        """
+        return self._data[:self._length].T
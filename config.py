@@ -0,0 +1,204 @@
+import dataclasses
+import hashlib
+import os
+from entities import AnimalInventory, BuildingFactory, animal_types, building_types
+from models import Nation, Resources, Combat, ResearchAndDevelopment, EnemyNation
+from utils import ConfigError
+
+# Sections of the models' file, in the order `ModelsConfig.build` returns them.
+SECTIONS = {
+    "nation": Nation,
+    "resources": Resources,
+    "combat": Combat,
+    "research_and_dev": ResearchAndDevelopment,
+    "enemy_nation": EnemyNation,
+}
+
+_cache = {}  # absolute path: (mtime_ns, size, content hash, ModelsConfig)
+
+def _parse_yaml(content: bytes):
+    # yaml is imported on the first file read, not with the engine.
+    import yaml
+
+    try:
+        # The libyaml bindings parse several times faster than the pure Python loader.
+        loader = yaml.CSafeLoader
+    except AttributeError:
+        loader = yaml.SafeLoader
+    return yaml.load(content, Loader=loader)
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _check_value(name: str, field: dataclasses.Field, value):
+    if value is None and field.default is None:
+        return
+    kind = field.type
+    if kind is AnimalInventory:
+        names, known = value, animal_types
+    elif getattr(kind, "__origin__", None) is list:
+        names, known = value, building_types
+    else:
+        valid = {
+            int: lambda: isinstance(value, int) and not isinstance(value, bool),
+            float: lambda: _is_number(value),
+            bool: lambda: isinstance(value, bool),
+            str: lambda: isinstance(value, str),
+        }.get(kind)
+        if valid is None:
+            raise ConfigError(f"{name} cannot be set from the models' data")
+        if not valid():
+            raise ConfigError(f"{name} has to be of type {kind.__name__}, got {value!r}")
+        return
+    if not isinstance(names, list):
+        raise ConfigError(f"{name} has to be a list of names, got {value!r}")
+    unknown = [item for item in names if item not in known]
+    if unknown:
+        raise ConfigError(f"{name} has unknown names {unknown}, choose from {list(known)}")
+
+def _fields(cls) -> dict:
+    return {field.name: field for field in dataclasses.fields(cls)}
+
+def field_type(name: str):
+    """
+    Returns:
+        type: The type of a dotted field, e.g. int for "nation.road_gold_generation",
+        or None if the field is unknown.
+    """
+    section, _, field = name.partition(".")
+    if section not in SECTIONS:
+        return None
+    field = _fields(SECTIONS[section]).get(field)
+    return field.type if field is not None else None
+
+def validate(data: dict) -> dict:
+    """
+    Checks the models' data against the fields of the models' dataclasses.
+
+    Args:
+        data (dict): Sections of the models' file.
+
+    Returns:
+        dict: The data, with every section copied.
+
+    Raises:
+        ConfigError: If a section or field is unknown, a required field is
+            missing or a value does not have the type of its field.
+    """
+    if not isinstance(data, dict):
+        raise ConfigError("The models' data has to be a mapping of sections")
+    unknown = set(data) - set(SECTIONS)
+    if unknown:
+        raise ConfigError(f"Unknown sections {sorted(unknown)}, choose from {list(SECTIONS)}")
+    validated = {}
+    for section, values in data.items():
+        if values is None:
+            continue
+        if not isinstance(values, dict):
+            raise ConfigError(f"{section} has to be a mapping of fields")
+        fields = _fields(SECTIONS[section])
+        unknown = set(values) - set(fields)
+        if unknown:
+            raise ConfigError(f"Unknown fields in {section}: {sorted(unknown)}")
+        missing = [
+            name for name, field in fields.items()
+            if name not in values and field.default is dataclasses.MISSING and field.default_factory is dataclasses.MISSING
+        ]
+        if missing:
+            raise ConfigError(f"Missing fields in {section}: {missing}")
+        for name, value in values.items():
+            _check_value(f"{section}.{name}", fields[name], value)
+        validated[section] = dict(values)
+    return validated
+
+class ModelsConfig:
+    """
+    Validated models' data that builds fresh model instances without parsing
+    or checking it again.
+
+    Attributes:
+        data (dict): The validated sections. It must not be modified.
+        digest (str): Hash of the data it was read from.
+
+    Methods:
+        build(overrides): Create the model instances.
+        with_overrides(overrides): Get the data with some fields replaced.
+    """
+    def __init__(self, data: dict, digest: str = None):
+        self.data = validate(data)
+        self.digest = digest
+
+    def with_overrides(self, overrides: dict) -> dict:
+        """
+        Returns a copy of the data with some fields replaced. Only the new
+        values are checked.
+
+        Args:
+            overrides (dict): New values keyed by dotted field, e.g.
+                {"enemy_nation.attack_coefficient": 0.5}.
+
+        Raises:
+            ConfigError: If a field is unknown or a value does not have its type.
+        """
+        data = dict(self.data)
+        for name, value in overrides.items():
+            section, _, field = name.partition(".")
+            if section not in data or field not in _fields(SECTIONS[section]):
+                raise ConfigError(f"Unknown field: {name}")
+            _check_value(name, _fields(SECTIONS[section])[field], value)
+            if data[section] is self.data[section]:
+                data[section] = dict(data[section])
+            data[section][field] = value
+        return data
+
+    def build(self, overrides: dict = None) -> tuple:
+        """
+        Args:
+            overrides (dict): Dotted fields replacing the values of the data, see `with_overrides`.
+
+        Returns:
+            tuple: New instances of Nation, Resources, Combat, ResearchAndDevelopment
+            and EnemyNation. A section missing from the data gives None.
+        """
+        data = self.with_overrides(overrides) if overrides else self.data
+        factory = BuildingFactory()
+        models = []
+        for section, cls in SECTIONS.items():
+            values = data.get(section)
+            if values is None:
+                models.append(None)
+                continue
+            values = dict(values)
+            # Lists are the only mutable values, every instance gets its own.
+            for name, value in values.items():
+                if isinstance(value, list):
+                    values[name] = list(value) if name == "animals" else [factory.create(item) for item in value]
+            models.append(cls(**values))
+        return tuple(models)
+
+def load_config(path: str = 'models.yml') -> ModelsConfig:
+    """
+    Reads and validates a models' file. The result is cached per file and
+    reused while the file's modification time and size, or else its
+    contents, do not change.
+
+    Raises:
+        ConfigError: If the data does not match the models.
+    """
+    key = os.path.abspath(path)
+    stat = os.stat(key)
+    cached = _cache.get(key)
+    if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[3]
+    with open(key, 'rb') as file:
+        content = file.read()
+    digest = hashlib.sha256(content).hexdigest()
+    if cached is not None and cached[2] == digest:
+        config = cached[3]
+    else:
+        try:
+            config = ModelsConfig(_parse_yaml(content) or {}, digest)
+        except ConfigError as e:
+            raise ConfigError(f"{path}: {e}") from None
+    _cache[key] = (stat.st_mtime_ns, stat.st_size, digest, config)
+    return config
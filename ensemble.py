@@ -0,0 +1,268 @@
+from collections import deque
+from contextlib import redirect_stdout
+from dataclasses import dataclass
+import math
+import os
+import numpy as np
+from eventlog import event_log
+from config import load_config
+from historics import StatsCache, SummaryStatsCache
+from online import RunningStats, P2Quantile
+from simulation import Simulation
+
+@dataclass
+class EnsembleResult():
+    """
+    Aggregated per-tick statistics of an ensemble of simulation runs.
+
+    Attributes:
+        replicas (int): Number of runs aggregated.
+        metrics (tuple[str]): Names of the metrics, in the order of the first axis of the arrays.
+        quantiles (tuple[float]): Quantiles computed for every metric and tick.
+        mean (np.ndarray): Mean per metric and tick, shape (metrics, ticks).
+        std (np.ndarray): Standard deviation per metric and tick, shape (metrics, ticks).
+        quantile_values (np.ndarray): Quantiles per metric and tick, shape (quantiles, metrics, ticks).
+        time (np.ndarray): Tick (starting at 1) of every column of the arrays when
+            only some ticks are kept, None when there is a column per tick.
+        fields (tuple[str]): Names of the columns of the arrays when the replicas
+            only kept summary statistics (see `SummaryStatsCache.FIELDS`) instead
+            of a column per tick, None otherwise.
+
+    Methods:
+        metric(name): Get the statistics of a single metric.
+        save(path): Save the statistics to a .npz file.
+        load(path): Read statistics saved with `save`.
+    """
+    replicas: int
+    metrics: tuple
+    quantiles: tuple
+    mean: np.ndarray
+    std: np.ndarray
+    quantile_values: np.ndarray
+    time: np.ndarray = None
+    fields: tuple = None
+
+    def metric(self, name: str) -> dict:
+        index = self.metrics.index(name)
+        stats = {"mean": self.mean[index], "std": self.std[index]}
+        for q, values in zip(self.quantiles, self.quantile_values[:, index]):
+            stats[f"q{q:g}"] = values
+        return stats
+
+    @classmethod
+    def load(cls, path: str) -> "EnsembleResult":
+        with np.load(path) as data:
+            return cls(
+                replicas=int(data["replicas"]),
+                metrics=tuple(data["metrics"].tolist()),
+                quantiles=tuple(data["quantiles"].tolist()),
+                mean=data["mean"],
+                std=data["std"],
+                quantile_values=data["quantile_values"],
+                time=data["time"] if "time" in data else None,
+                fields=tuple(data["fields"].tolist()) if "fields" in data else None,
+            )
+
+    def save(self, path: str):
+        extra = {"time": self.time} if self.time is not None else {}
+        if self.fields is not None:
+            extra["fields"] = np.array(self.fields)
+        np.savez(
+            path,
+            replicas=self.replicas,
+            metrics=np.array(self.metrics),
+            quantiles=np.array(self.quantiles),
+            mean=self.mean,
+            std=self.std,
+            quantile_values=self.quantile_values,
+            **extra,
+        )
+
+# Replicas per chunk by default when the ensemble is aggregated online.
+ONLINE_CHUNK_SIZE = 4
+
+def run_replica(models_path: str, ticks: int, actions: dict, seed_sequence: np.random.SeedSequence, overrides: dict = None,
+                stats: str = "full") -> np.ndarray:
+    """
+    Runs one headless simulation built from fresh model instances.
+
+    Args:
+        models_path (str): YAML file with the models' data.
+        ticks (int): Number of ticks to run.
+        actions (dict): Action schedule for `Simulation.run_batch`.
+        seed_sequence (np.random.SeedSequence): Seed of this replica.
+        overrides (dict): Dotted fields replacing the values of the YAML file.
+        stats (str): "full" records the historics of every tick, "summary" only
+            keeps their statistics in a SummaryStatsCache.
+
+    Returns:
+        np.ndarray: The recorded historics, shape (len(StatsCache.COLUMNS), ticks),
+        or with "summary" their statistics, shape (len(StatsCache.COLUMNS), len(SummaryStatsCache.FIELDS)).
+    """
+    nation, resources, combat, research_and_dev, enemy_nation = load_config(models_path).build(overrides)
+    stats_cache = SummaryStatsCache() if stats == "summary" else None
+    simulation = Simulation(nation=nation, resources=resources, combat=combat, research_and_dev=research_and_dev, enemy_nation=enemy_nation,
+                            stats_cache=stats_cache, seed=seed_sequence)
+    simulation.run_batch(ticks, actions)
+    return simulation.stats_cache.to_array()
+
+def sample_ticks(ticks: int, points: int) -> np.ndarray:
+    """
+    Returns:
+        np.ndarray: Up to `points` evenly spaced indexes in [0, ticks), always
+        including the last tick.
+    """
+    return np.unique(np.linspace(0, ticks - 1, min(points, ticks)).round().astype(np.int64))
+
+def _run_chunk(models_path, ticks, actions, seed_sequences, overrides=None, kept_ticks=None, stats="full"):
+    # Workers are headless, the event log and console output are only noise
+    # here. Chunks run in the caller's process get its log back afterwards.
+    historics = []
+    with event_log.silenced(), open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        for seed_sequence in seed_sequences:
+            replica = run_replica(models_path, ticks, actions, seed_sequence, overrides, stats)
+            # The full historics of a replica are dropped as soon as it ends.
+            historics.append(replica if kept_ticks is None else replica[:, kept_ticks].copy())
+    return np.stack(historics)
+
+class _OnlineStatistics:
+    """
+    Mean, standard deviation and P² quantile estimates per metric and tick,
+    updated one replica at a time.
+    """
+    def __init__(self, quantiles: tuple, shape: tuple):
+        self.quantiles = tuple(quantiles)
+        self.moments = RunningStats(shape)
+        self.estimators = [P2Quantile(q, shape) for q in quantiles]
+
+    def add(self, historics: np.ndarray):
+        self.moments.add(historics)
+        for estimator in self.estimators:
+            estimator.add(historics)
+
+    def result(self, time: np.ndarray, fields: tuple = None) -> EnsembleResult:
+        return EnsembleResult(
+            replicas=self.moments.count,
+            metrics=StatsCache.COLUMNS,
+            quantiles=self.quantiles,
+            mean=self.moments.mean,
+            std=self.moments.std(),
+            quantile_values=np.stack([estimator.value() for estimator in self.estimators]),
+            time=time,
+            fields=fields,
+        )
+
+def run_ensemble(replicas: int, ticks: int, actions: dict = None, models_path: str = 'models.yml', seed=None,
+                 workers: int = None, chunk_size: int = None, quantiles: tuple = (0.05, 0.5, 0.95),
+                 engine: str = "object", overrides: dict = None, online: bool = False,
+                 points: int = None, stats: str = "full") -> EnsembleResult:
+    """
+    Runs independent replicas of the same models across a process pool and
+    aggregates their historics tick by tick.
+
+    Each worker receives chunks of replica seeds and only returns the stacked
+    historics arrays of the chunk.
+
+    By default all the historics are gathered and the statistics are exact.
+    With `online`, every chunk is folded into running moments and P² quantile
+    estimates as soon as it arrives and then dropped, and only a few chunks
+    are in flight at once: by default a chunk holds at most
+    `ONLINE_CHUNK_SIZE` replicas and about one chunk per worker is pending, so
+    memory depends on the number of workers and not on the number of replicas. Combined with `points`, ensembles of thousands
+    of long runs fit in memory.
+
+    With `stats` set to "summary", every replica only keeps the min, max,
+    mean, std and last value of its metrics, and the statistics are computed
+    over those instead of per tick.
+
+    Args:
+        replicas (int): Number of independent runs.
+        ticks (int): Number of ticks of every run.
+        actions (dict): Action schedule shared by all the runs.
+        models_path (str): YAML file with the models' data.
+        seed (int): Root seed of the ensemble. Every replica gets its own child seed.
+        workers (int): Number of worker processes. Defaults to the CPU count; 1 runs in-process.
+        chunk_size (int): Replicas per task. Defaults to about four tasks per worker,
+            and to at most `ONLINE_CHUNK_SIZE` with `online`.
+        quantiles (tuple[float]): Quantiles to compute per tick.
+        engine (str): "object" runs one Simulation per replica, "vectorized" advances
+            all the replicas together in a VectorizedEnsemble (idle runs only).
+        overrides (dict): Dotted fields replacing the values of the YAML file.
+        online (bool): Whether to aggregate the replicas as they finish, with
+            estimated quantiles, instead of keeping all of them.
+        points (int): Number of evenly spaced ticks the statistics are kept
+            for, all of them by default. Only used by the "object" engine.
+        stats (str): "full" or "summary", what every replica records, see `run_replica`.
+            Only used by the "object" engine.
+
+    Returns:
+        EnsembleResult: The aggregated statistics.
+    """
+    if stats not in ("full", "summary"):
+        raise ValueError(f"Unknown stats mode: {stats}")
+    if stats == "summary" and (engine != "object" or points):
+        raise ValueError("Summary stats are only kept by the object engine and cannot be combined with points")
+    if engine == "vectorized":
+        from vectorized import VectorizedEnsemble
+
+        if actions:
+            raise ValueError("The vectorized engine does not support action schedules")
+        models = load_config(models_path).build(overrides)
+        return VectorizedEnsemble(*models, replicas=replicas, seed=seed).run(ticks, quantiles)
+    elif engine != "object":
+        raise ValueError(f"Unknown ensemble engine: {engine}")
+
+    workers = workers or os.cpu_count() or 1
+    if not chunk_size:
+        chunk_size = max(1, math.ceil(replicas / (workers * 4)))
+        if online:
+            chunk_size = min(chunk_size, ONLINE_CHUNK_SIZE)
+    seed_sequences = np.random.SeedSequence(seed).spawn(replicas)
+    chunks = [seed_sequences[i:i + chunk_size] for i in range(0, replicas, chunk_size)]
+
+    kept_ticks = sample_ticks(ticks, points) if points else None
+    time = kept_ticks + 1 if points else None
+    fields = SummaryStatsCache.FIELDS if stats == "summary" else None
+    columns = len(fields) if fields else ticks if kept_ticks is None else len(kept_ticks)
+    statistics = _OnlineStatistics(quantiles, (len(StatsCache.COLUMNS), columns)) if online else None
+    results = []
+
+    def gather(historics):
+        if statistics is None:
+            results.append(historics)
+        else:
+            for replica in historics:
+                statistics.add(replica)
+
+    if workers == 1:
+        for chunk in chunks:
+            gather(_run_chunk(models_path, ticks, actions, chunk, overrides, kept_ticks, stats))
+    else:
+        # Only the parent needs the pool, the workers import this module as well.
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Chunks are submitted as earlier ones are gathered, so finished
+            # chunks do not pile up in memory.
+            in_flight = workers + 1 if online else 2 * workers
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(_run_chunk, models_path, ticks, actions, chunk, overrides, kept_ticks, stats))
+                if len(pending) >= in_flight:
+                    gather(pending.popleft().result())
+            while pending:
+                gather(pending.popleft().result())
+
+    if statistics is not None:
+        return statistics.result(time, fields)
+    historics = np.concatenate(results)
+    return EnsembleResult(
+        replicas=replicas,
+        metrics=StatsCache.COLUMNS,
+        quantiles=tuple(quantiles),
+        mean=historics.mean(axis=0),
+        std=historics.std(axis=0),
+        quantile_values=np.quantile(historics, quantiles, axis=0),
+        time=time,
+        fields=fields,
+    )
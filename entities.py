@@ -1,11 +1,17 @@
+from collections import deque
+import heapq
+
 animal_types = ["Bunny", "Fox", "Deer", "Bear"]
 building_types = ["Gold", "Food", "House", "Attack", "Defense"]
 
 class Animal:
     """ 
     Abstract class for animals. Each animal type should provide implementations 
-    for these methods.
+    for these methods. Animals have no state, so a single shared instance of
+    each type is used for every spawn (see AnimalFactory).
     """
+    __slots__ = ()
+
     def name() -> str:
         pass
 
@@ -20,6 +26,8 @@ class Animal:
 
 class Bunny(Animal):
     """ Specific class for a Bunny type animal with its characteristics. """
+    __slots__ = ()
+
     def name(self) -> str:
         return "Bunny"
     
@@ -34,6 +42,8 @@ class Bunny(Animal):
 
 class Fox(Animal):
     """ Specific class for a Fox type animal with its characteristics. """  
+    __slots__ = ()
+
     def name(self) -> str:
         return "Fox"
     
@@ -48,6 +58,8 @@ class Fox(Animal):
 
 class Deer(Animal):
     """ Specific class for a Deer type animal with its characteristics. """
+    __slots__ = ()
+
     def name(self) -> str:
         return "Deer"
     
@@ -62,6 +74,8 @@ class Deer(Animal):
 
 class Bear(Animal):
     """ Specific class for a Bear type animal with its characteristics. """
+    __slots__ = ()
+
     def name(self) -> str:
         return "Bear"
     
@@ -74,61 +88,143 @@ class Bear(Animal):
     def workers_needed(self) -> int:
         return 4
 
+_ANIMALS = {animal.name(): animal for animal in (Bunny(), Fox(), Deer(), Bear())}
+
 class AnimalFactory:
     """
-    Factory class for creating Animal instances based on their names.
+    Factory class for getting Animal instances based on their names. The
+    instances are flyweights shared by every caller.
     
     Raises:
         RuntimeError: When trying to create an animal type that isn't supported.
     """
     def create(self, name: str) -> Animal:
-        if name == "Bunny":
-            return Bunny()
-        elif name == "Fox":
-            return Fox()
-        elif name == "Deer":
-            return Deer()
-        elif name == "Bear":
-            return Bear()
-        else:
+        try:
+            return _ANIMALS[name]
+        except KeyError:
+            raise RuntimeError() from None
+
+class AnimalInventory:
+    """
+    Animals of a nation, kept as a count per type of `animal_types` so that
+    spawning, hunting and counting are O(1) however many animals there are.
+
+    Attributes:
+        capacity (int): Maximum number of animals kept; spawns beyond it are
+            dropped. None means no limit.
+        ages (dict[str, deque]): Spawn tick of every animal per type, oldest
+            first, when created with `track_ages`. Hunts take the oldest animal.
+
+    Methods:
+        add(name, tick): Add an animal of a type.
+        get(name): Get an animal of a type, if there is any, without taking it.
+        take(name): Remove an animal of a type.
+        count(name): Count the animals of a type.
+        to_list(): Get the name of every animal.
+    """
+    __slots__ = ("capacity", "ages", "_counts", "_total")
+
+    def __init__(self, animals=(), capacity: int = None, track_ages: bool = False):
+        self.capacity = capacity
+        self.ages = {name: deque() for name in animal_types} if track_ages else None
+        self._counts = dict.fromkeys(animal_types, 0)
+        self._total = 0
+        for animal in animals:
+            self.add(animal if isinstance(animal, str) else animal.name())
+
+    def __len__(self) -> int:
+        return self._total
+
+    def __repr__(self) -> str:
+        counts = ", ".join(f"{name}={count}" for name, count in self._counts.items())
+        return f"AnimalInventory({counts})"
+
+    def add(self, name: str, tick: int = 0) -> bool:
+        """
+        Returns:
+            bool: Whether the animal was added, False when the inventory is full.
+
+        Raises:
+            RuntimeError: When the animal type isn't supported.
+        """
+        if name not in self._counts:
             raise RuntimeError()
+        if self.capacity is not None and self._total >= self.capacity:
+            return False
+        self._counts[name] += 1
+        self._total += 1
+        if self.ages is not None:
+            self.ages[name].append(tick)
+        return True
+
+    def get(self, name: str) -> Animal:
+        if self._counts.get(name, 0) <= 0:
+            return None
+        return _ANIMALS[name]
+
+    def take(self, name: str) -> Animal:
+        animal = self.get(name)
+        if animal is None:
+            return None
+        self._counts[name] -= 1
+        self._total -= 1
+        if self.ages is not None:
+            self.ages[name].popleft()
+        return animal
+
+    def count(self, name: str) -> int:
+        return self._counts.get(name, 0)
+
+    def to_list(self) -> list[str]:
+        return [name for name, count in self._counts.items() for _ in range(count)]
 
 class Building:
     """ 
     Base class for buildings with common attributes and methods. Specific building 
     types will inherit from this.
     """
+    __slots__ = ("type", "level", "improving")
+
     def __init__(self, type: str, level: int=1) -> None:
         self.type = type
         self.level = level
         self.improving = False
-        pass
 
     def workers_needed(self) -> int:
         pass
 
 class GoldBuilding(Building):
     """ Specific class for a Gold-type building with its characteristics. """
+    __slots__ = ()
+
     def workers_needed(self) -> int:
         return self.level * 2
     
 class FoodBuilding(Building):
     """ Specific class for a Food-type building with its characteristics. """
+    __slots__ = ()
+
     def workers_needed(self) -> int:
         return self.level * 3
 
 class HouseBuilding(Building):
     """ Specific class for a House-type building with its characteristics. """
+    __slots__ = ()
+
     def workers_needed(self) -> int:
         return self.level
     
 class AttackBuilding(Building):
     """ Specific class for a Attack-type building with its characteristics. """
+    __slots__ = ()
+
     def workers_needed(self) -> int:
         return self.level * 4
     
 class DefenseBuilding(Building):
     """ Specific class for a Defense-type building with its characteristics. """
+    __slots__ = ()
+
     def workers_needed(self) -> int:
         return self.level * 3
     
@@ -144,6 +240,62 @@ class BuildingFactory:
         elif building_type == "House":
             return HouseBuilding(building_type)
         elif building_type == "Attack":
-            return HouseBuilding(building_type)
+            return AttackBuilding(building_type)
         elif building_type == "Defense":
-            return HouseBuilding(building_type)
\ No newline at end of file
+            return DefenseBuilding(building_type)
+
+class BuildingRegistry:
+    """
+    Index of the buildings of a nation by type. For each type it keeps the
+    buildings that are not being improved in a heap ordered by level (then by
+    construction order), so picking the building to improve is O(log n), and
+    it keeps the count per type up to date as buildings are added.
+
+    Methods:
+        add(building): Register a finished building.
+        count(building_type): Count the buildings of a type.
+        least_improved(building_type): Get the lowest level building of a type that is not being improved.
+        start_improvement(building): Mark the building returned by `least_improved` as being improved.
+        finish_improvement(building): Raise the level of an improved building and make it available again.
+    """
+    __slots__ = ("total", "_counts", "_available", "_added")
+
+    def __init__(self, buildings=()):
+        self.total = 0
+        self._counts = dict.fromkeys(building_types, 0)
+        self._available = {building_type: [] for building_type in building_types}
+        self._added = 0
+        for building in buildings:
+            self.add(building)
+
+    def __len__(self) -> int:
+        return self.total
+
+    def add(self, building: Building):
+        self._counts[building.type] += 1
+        self.total += 1
+        if not building.improving:
+            self._push(building)
+
+    def count(self, building_type: str) -> int:
+        return self._counts.get(building_type, 0)
+
+    def least_improved(self, building_type: str) -> Building:
+        available = self._available.get(building_type)
+        if not available:
+            return None
+        return available[0][2]
+
+    def start_improvement(self, building: Building):
+        _, _, least_improved = heapq.heappop(self._available[building.type])
+        assert least_improved is building, "Only the least improved building can start an improvement"
+        building.improving = True
+
+    def finish_improvement(self, building: Building):
+        building.improving = False
+        building.level += 1
+        self._push(building)
+
+    def _push(self, building: Building):
+        heapq.heappush(self._available[building.type], (building.level, self._added, building))
+        self._added += 1
@@ -0,0 +1,146 @@
+from collections import deque, namedtuple
+from contextlib import contextmanager
+import json
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+OFF = 100
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING, "off": OFF}
+
+EventRecord = namedtuple("EventRecord", ["tick", "level", "kind", "payload"])
+
+# Console text of every kind of record, formatted with its payload.
+MESSAGES = {
+    "GoldMined": "Gold mined. Disposing resources.",
+    "RoadGoldCollected": "Gold collected from roads. Gold earned: {gold}",
+    "RoadsBuilt": "Roads built",
+    "AnimalHunted": "Animal {animal} hunted, added {food} food",
+    "BuildingBuilt": "{building} building built.",
+    "AttackStarted": "Starting attack to enemy nation",
+    "AttackFailed": "Attack failed. Enemy nation won.",
+    "AttackWon": "Attack success. Our nation won!",
+    "UnitsLost": "Our nation lost {units} unit/s",
+    "LootAdded": "Added {food} food and {gold} gold",
+    "TroopsRested": "Your troops are not longer resting. You can attack again",
+    "EnemyAttack": "Enemy nation attack",
+    "DefenseWon": "Defend success!",
+    "DefenseFailed": "Defense failed",
+    "ResourcesLost": "We lost {food} food and {gold} gold",
+    "GoldMineSpawned": "Gold mine spawned",
+    "AnimalSpawned": "{animal} spawned",
+}
+
+class NullSink:
+    """ Sink that drops every record. """
+    def write(self, record: EventRecord):
+        pass
+
+    def close(self):
+        pass
+
+class ConsoleSink:
+    """ Sink that prints the console text of every record. """
+    def write(self, record: EventRecord):
+        print(MESSAGES[record.kind].format(**record.payload))
+
+    def close(self):
+        pass
+
+class RingBufferSink:
+    """
+    Sink that keeps the last records in memory.
+
+    Attributes:
+        records (deque[EventRecord]): The kept records, oldest first.
+    """
+    def __init__(self, capacity: int = 10000):
+        self.records = deque(maxlen=capacity)
+
+    def write(self, record: EventRecord):
+        self.records.append(record)
+
+    def close(self):
+        pass
+
+class JsonlFileSink:
+    """
+    Sink that appends every record as a JSON line to a file, writing them in
+    batches of `buffer_size` records.
+    """
+    def __init__(self, path: str, buffer_size: int = 1000):
+        self._file = open(path, 'a')
+        self._buffer = []
+        self.buffer_size = buffer_size
+
+    def write(self, record: EventRecord):
+        line = {"tick": record.tick, "level": record.level, "kind": record.kind, **record.payload}
+        # NumPy scalars are turned into their Python value.
+        self._buffer.append(json.dumps(line, default=lambda value: value.item()))
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._file.write("\n".join(self._buffer) + "\n")
+            self._buffer.clear()
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+class EventLog:
+    """
+    Structured log of what happens in the simulation. Records below `level`
+    are discarded, and callers check the level before building a record:
+
+        if event_log.level <= INFO:
+            event_log.log(INFO, "GoldMined", gold=300)
+
+    so a disabled log costs one comparison per call site.
+
+    Attributes:
+        sink: Object with `write(record)` and `close()` methods receiving the records.
+        level (int): Minimum level of the records that are kept.
+        tick (int): Current tick of the simulation, stamped on every record.
+
+    Methods:
+        configure(sink, level): Replace the sink and the level.
+        silenced(): Context manager that turns the log off and then restores it.
+        log(level, kind, **payload): Send a record to the sink.
+        close(): Close the sink.
+    """
+    def __init__(self, sink=None, level: int = INFO):
+        self.sink = sink if sink is not None else NullSink()
+        self.level = level
+        self.tick = 0
+
+    def configure(self, sink, level: int):
+        self.sink.close()
+        self.sink = sink
+        self.level = level
+
+    @contextmanager
+    def silenced(self):
+        """
+        Discards every record inside the block, then restores the sink, level
+        and tick of the log. The sink is kept open in between.
+        """
+        sink, level, tick = self.sink, self.level, self.tick
+        self.sink, self.level = NullSink(), OFF
+        try:
+            yield self
+        finally:
+            self.sink, self.level, self.tick = sink, level, tick
+
+    def log(self, level: int, kind: str, **payload):
+        if level >= self.level:
+            self.sink.write(EventRecord(self.tick, level, kind, payload))
+
+    def close(self):
+        self.sink.close()
+
+# Log shared by the events, shows every message on the console by default.
+event_log = EventLog(ConsoleSink(), DEBUG)
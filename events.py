@@ -2,9 +2,10 @@ from __future__ import annotations  # <-- Additional import.
 import typing
 if typing.TYPE_CHECKING:
     from models import Nation, Resources, Combat, ResearchAndDevelopment, EnemyNation
-from entities import Animal, BuildingFactory, Building, GoldBuilding, HouseBuilding, FoodBuilding, AnimalFactory, animal_types, AttackBuilding, DefenseBuilding
+from entities import Animal, BuildingFactory, Building, GoldBuilding, HouseBuilding, FoodBuilding, animal_types, AttackBuilding, DefenseBuilding
 import numpy as np
 import sys
+from eventlog import event_log, DEBUG, INFO
 from utils import EventAdditionError, get_buildings_count
 
 class Event:
@@ -13,17 +14,30 @@ class Event:
 
     Attributes:
         ticks (int): The number of ticks for the event.
+        period (int): Ticks between two calls to `tick()` for events that act
+            while they run. None for events that only count down and act when
+            they finish, which the EventHandler only wakes up on completion.
 
     Methods:
         tick(): Advance the event by one tick.
+        complete(): Run the last tick of a count down event.
         is_finished(): Check if the event has finished.
     """
+    __slots__ = ("ticks",)
+    period = None
+    # Periodic events whose effect Simulation.fast_forward knows how to sample.
+    skippable = False
+
     def __init__(self) -> None:
         self.ticks = 0
 
     def tick(self):
         pass
 
+    def complete(self):
+        self.ticks = 1
+        self.tick()
+
     def is_finished(self) -> bool:
         return self.ticks <= 0
 
@@ -38,6 +52,7 @@ class MineGoldEvent(Event):
     Methods:
         tick(): Advance the event by one tick.
     """
+    __slots__ = ("nation", "resources")
     GOLD_PER_MINE = 300
     NEEDED_WORKERS = 2
 
@@ -61,7 +76,8 @@ class MineGoldEvent(Event):
         self.ticks -= 1
         if self.ticks > 0:
             return
-        print("Gold mined. Disposing resources.")
+        if event_log.level <= INFO:
+            event_log.log(INFO, "GoldMined", gold=MineGoldEvent.GOLD_PER_MINE)
         self.nation.current_busy_population_count -= MineGoldEvent.NEEDED_WORKERS
         self.resources.gold_count += MineGoldEvent.GOLD_PER_MINE
 
@@ -76,6 +92,8 @@ class CollectRoadGold(Event):
     Methods:
         tick(): Advance the event by one tick.
     """
+    __slots__ = ("nation", "resource", "resources", "event_handler", "gold_earned")
+    period = 1
 
     def __init__(self, nation: Nation, resources: Resources, event_handler):
         super().__init__()
@@ -94,7 +112,8 @@ class CollectRoadGold(Event):
     def tick(self):
         self.ticks -= 1
         if self.ticks <= 0:
-            print(f"Gold collected from roads. Gold earned: {self.gold_earned}")
+            if event_log.level <= INFO:
+                event_log.log(INFO, "RoadGoldCollected", gold=self.gold_earned)
             return
         self.resources.gold_count += self.gold_earned
         self.event_handler.collecting_gold = False
@@ -109,6 +128,7 @@ class BuildRoadEvent(Event):
     Methods:
         tick(): Advance the event by one tick.
     """
+    __slots__ = ("nation",)
 
     def __init__(self, nation: Nation, res: Resources, combat: Combat):
         super().__init__()
@@ -123,7 +143,8 @@ class BuildRoadEvent(Event):
         if self.ticks > 0:
             return
         self.nation.roads_count += 4
-        print("Roads built")
+        if event_log.level <= INFO:
+            event_log.log(INFO, "RoadsBuilt", roads=4)
 
 class OpenSpaceEvent(Event):
     """
@@ -135,7 +156,7 @@ class OpenSpaceEvent(Event):
     Methods:
         tick(): Advance the event by one tick.
     """
-
+    __slots__ = ("nation",)
     SPACE_TICKS = 5
     NEEDED_WORKERS = 3
 
@@ -163,15 +184,13 @@ class OpenSpaceEvent(Event):
             self.nation.not_worked_space = 0
 
 class HuntAnimalEvent(Event):
+    __slots__ = ("nation", "resources", "animal")
 
     def __init__(self, nation: Nation, animal_name: str, resources: Resources):
         super().__init__()
         self.nation = nation
         self.resources = resources
-        animal: Animal = self.find_first_occurrence(
-            nation.animals, 
-            lambda animal: animal.name() == animal_name
-        )
+        animal: Animal = nation.animals.get(animal_name)
         if animal == None:
             raise EventAdditionError(f"There is no {animal_name} in the nation currently. Animals: {nation.animals}")
         else:
@@ -181,7 +200,7 @@ class HuntAnimalEvent(Event):
                 self.ticks = animal.hunt_time()
                 self.animal = animal
                 self.nation.current_busy_population_count += self.animal.workers_needed()
-                self.nation.animals.remove(animal)
+                self.nation.animals.take(animal_name)
     
     def tick(self):
         self.ticks -= 1
@@ -190,13 +209,8 @@ class HuntAnimalEvent(Event):
         #todo revisar si puede almacenar mas comida
         self.resources.food_count += self.animal.food_given()
         self.nation.current_busy_population_count -= self.animal.workers_needed()
-        print(f"Animal {self.animal.name()} hunted, added {self.animal.food_given()} food")
-    
-    def find_first_occurrence(self, lst, predicate):
-        try:
-            return next(x for x in lst if predicate(x))
-        except StopIteration:
-            return None
+        if event_log.level <= INFO:
+            event_log.log(INFO, "AnimalHunted", animal=self.animal.name(), food=self.animal.food_given())
 
 class BuildBuilding(Event):
     """
@@ -212,6 +226,8 @@ class BuildBuilding(Event):
     Methods:
         tick(): Advance the event by one tick.
     """
+    __slots__ = ("nation", "res", "combat", "building")
+
     def __init__(self, nation: Nation, rd: ResearchAndDevelopment, res: Resources, combat: Combat, building_type: str, seed: int):
         super().__init__()
         building = BuildingFactory().create(building_type)
@@ -234,6 +250,7 @@ class BuildBuilding(Event):
         self.ticks = rd.bulding_build_time
         self.nation = nation
         self.res = res
+        self.combat = combat
         self.building = building
     
     def tick(self):
@@ -246,24 +263,28 @@ class BuildBuilding(Event):
             self.nation.population_count += 2
         elif type(self.building) is FoodBuilding or type(self.building) is GoldBuilding:
             self.res.gold_food_buildings.append(self.building)
+            self.nation.buildings.add(self.building)
         elif type(self.building) is AttackBuilding:
             self.combat.attack_buildings_count += 1
             self.combat.max_attack_units_count += 20
             self.combat.training_time += 1
             self.combat.attack_buildings.append(self.building)
+            self.nation.buildings.add(self.building)
             self.combat.calculate_attack_and_defense_rates()
         elif type(self.building) is DefenseBuilding:
             self.combat.defense_buildings_count += 1
             self.combat.max_defense_units_count += 20
             self.combat.training_time += 1
             self.combat.defense_buildings.append(self.building)
+            self.nation.buildings.add(self.building)
             self.combat.calculate_attack_and_defense_rates()
         
         self.nation.available_space -= 1
         if self.nation.available_space < 0:
             self.nation.available_space = 0
         self.nation.used_space += 1
-        print(f"{self.building.type} building built.")
+        if event_log.level <= INFO:
+            event_log.log(INFO, "BuildingBuilt", building=self.building.type)
 
 class ImproveBuilding(Event):
     """
@@ -279,39 +300,16 @@ class ImproveBuilding(Event):
     Methods:
         tick(): Advance the event by one tick.
     """
+    __slots__ = ("nation", "res", "building")
+
     def __init__(self, rd: ResearchAndDevelopment, nation: Nation, res: Resources, combat: Combat, building_name: str, seed):
         super().__init__()
-        building: Building = None
-
-        for b in res.gold_food_buildings:
-            if b.type == building_name:
-                building = b
-                if b.level + 1 > rd.max_building_improvements or b.improving:
-                    continue
-                else:
-                    break
-
-        for b in combat.attack_buildings:
-            if b.type == building_name:
-                building = b
-                if b.level + 1 > rd.max_building_improvements or b.improving:
-                    continue
-                else:
-                    break
-        
-        for b in combat.defense_buildings:
-            if b.type == building_name:
-                building = b
-                if b.level + 1 > rd.max_building_improvements or b.improving:
-                    continue
-                else:
-                    break
-
-        if building is None:
+        if nation.buildings.count(building_name) == 0:
             raise EventAdditionError(f"There is no {building_name} in the nation currently.")
 
-        if building.improving:
-            raise EventAdditionError(f"The {building.type} is already being improved.")
+        building: Building = nation.buildings.least_improved(building_name)
+        if building is None:
+            raise EventAdditionError(f"The {building_name} is already being improved.")
 
         if building.level >= rd.max_building_improvements:
             raise EventAdditionError("The building cannot be improved further before changing eras.")
@@ -337,14 +335,14 @@ class ImproveBuilding(Event):
         self.nation = nation
         self.res = res
         self.building = building
-        building.improving = True
+        nation.buildings.start_improvement(building)
     
     def tick(self):
         self.ticks -= 1
         if self.ticks > 0:
             return
         self.nation.current_busy_population_count -= self.building.workers_needed()
-        self.building.improving = False
+        self.nation.buildings.finish_improvement(self.building)
 
 class AttackEnemiesEvent(Event):
     """
@@ -354,12 +352,17 @@ class AttackEnemiesEvent(Event):
         enemy_nation (EnemyNation): The enemy nation being attacked.
         combat (Combat): Information about the nation's combat capabilities.
         res (Resources): The nation's resources.
+        battles (BattleRecorder): Where the outcome of the attack is recorded, if any.
+        nation (Nation): The attacking nation, whose clock stamps the record.
 
     Methods:
         tick(): Advance the event by one tick.
     """
-    def __init__(self, enemy_nation: EnemyNation, combat: Combat, res: Resources):
+    __slots__ = ("rng", "enemy_nation", "combat", "res", "battles", "nation")
+
+    def __init__(self, enemy_nation: EnemyNation, combat: Combat, res: Resources, rng=None, battles=None, nation: Nation = None):
         super().__init__()
+        self.rng = rng if rng is not None else np.random.default_rng()
         if combat.attack_units_count <= 0 or combat.attack_buildings_count <= 0:
             raise EventAdditionError("You don't have troops")
         elif combat.resting:
@@ -369,28 +372,42 @@ class AttackEnemiesEvent(Event):
             self.enemy_nation = enemy_nation
             self.combat = combat
             self.res = res
+            self.battles = battles
+            self.nation = nation
     
     def tick(self):
         self.ticks -= 1
         if self.ticks > 0 or self.ticks <= -1:
             return
-        print("Starting attack to enemy nation")
+        if event_log.level <= INFO:
+            event_log.log(INFO, "AttackStarted")
         defense_rate = (self.enemy_nation.defense_units_coefficient + self.enemy_nation.defense_units_coefficient) / 2
         if defense_rate >= self.combat.attack_force_rate:
-            print("Attack failed. Enemy nation won.")
+            if event_log.level <= INFO:
+                event_log.log(INFO, "AttackFailed")
+            if self.battles is not None:
+                self.battles.record(self.nation.current_time, True, False, self.combat.attack_units_count)
             self.combat.attack_units_count = 0
         else:
-            print("Attack success. Our nation won!")
+            if event_log.level <= INFO:
+                event_log.log(INFO, "AttackWon")
             max_attack_lost = max(1, self.combat.attack_units_count - 1)
-            lost_units = np.random.randint(low=1, high=max_attack_lost)
-            print(f"Our nation lost {lost_units} unit/s")
+            try:
+                lost_units = self.rng.integers(1, max_attack_lost)
+            except ValueError: # for low >= high error
+                lost_units = 1
+            if event_log.level <= INFO:
+                event_log.log(INFO, "UnitsLost", units=lost_units)
             self.combat.attack_units_count -= lost_units
             self.combat.resting = True
             new_food = self.enemy_nation.food_per_combat
             new_gold = self.enemy_nation.gold_per_combat
             self.res.food_count += new_food
             self.res.gold_count += new_gold
-            print(f"Added {new_food} food and {new_gold} gold")
+            if event_log.level <= INFO:
+                event_log.log(INFO, "LootAdded", food=new_food, gold=new_gold)
+            if self.battles is not None:
+                self.battles.record(self.nation.current_time, True, True, lost_units, new_food, new_gold)
 
 class RestFromAttackEvent(Event):
     """
@@ -402,6 +419,7 @@ class RestFromAttackEvent(Event):
     Methods:
         tick(): Advance the event by one tick.
     """
+    __slots__ = ("combat",)
     REST_TICKS = 20
 
     def __init__(self, combat: Combat):
@@ -413,7 +431,8 @@ class RestFromAttackEvent(Event):
         self.ticks -= 1
         if self.ticks > 0:
             return
-        print("Your troops are not longer resting. You can attack again")
+        if event_log.level <= INFO:
+            event_log.log(INFO, "TroopsRested")
         self.combat.resting = False
 
 class DefendFromEnemiesEvent(Event):
@@ -424,16 +443,24 @@ class DefendFromEnemiesEvent(Event):
         enemy_nation (EnemyNation): The enemy nation launching the attack.
         combat (Combat): Information about the nation's combat capabilities.
         res (Resources): The nation's resources.
+        battles (BattleRecorder): Where the outcome of the defense is recorded, if any.
+        nation (Nation): The attacked nation, whose clock stamps the record.
 
     Methods:
         tick(): Advance the event by one tick.
     """
-    def __init__(self, enemy_nation: EnemyNation, combat: Combat, res: Resources):
+    __slots__ = ("rng", "enemy_nation", "combat", "res", "battles", "nation")
+
+    def __init__(self, enemy_nation: EnemyNation, combat: Combat, res: Resources, rng=None, battles=None, nation: Nation = None):
         super().__init__()
-        print("Enemy nation attack")
+        if event_log.level <= INFO:
+            event_log.log(INFO, "EnemyAttack")
+        self.rng = rng if rng is not None else np.random.default_rng()
         self.enemy_nation = enemy_nation
         self.combat = combat
         self.res = res
+        self.battles = battles
+        self.nation = nation
         self.ticks = 1
     
     def tick(self):
@@ -441,19 +468,28 @@ class DefendFromEnemiesEvent(Event):
         if self.ticks != 0:
             return
         if self.combat.defense_units_count >= self.enemy_nation.attack_coefficient:
-            print("Defend success!")
+            if event_log.level <= INFO:
+                event_log.log(INFO, "DefenseWon")
+            units = self.combat.defense_units_count
             try:
-                self.combat.defense_units_count = np.random.randint(low=1, high=self.combat.defense_units_count - 1)
+                self.combat.defense_units_count = self.rng.integers(1, self.combat.defense_units_count - 1)
             except ValueError: # for low >= high error
                 self.combat.defense_units_count = 1
+            if self.battles is not None:
+                self.battles.record(self.nation.current_time, False, True, units - self.combat.defense_units_count)
         else:
-            print("Defense failed")
+            if event_log.level <= INFO:
+                event_log.log(INFO, "DefenseFailed")
+            units = self.combat.defense_units_count
             self.combat.defense_units_count = 0
             lost_food = min(self.res.food_count, self.enemy_nation.food_per_combat)
             lost_gold = min(self.res.gold_count, self.enemy_nation.gold_per_combat)
             self.res.food_count -= lost_food
             self.res.gold_count -= lost_gold
-            print(f"We lost {lost_food} food and {lost_gold} gold")
+            if event_log.level <= INFO:
+                event_log.log(INFO, "ResourcesLost", food=lost_food, gold=lost_gold)
+            if self.battles is not None:
+                self.battles.record(self.nation.current_time, False, False, units, -lost_food, -lost_gold)
 
 class SpawnMineEvent(Event):
     """
@@ -465,37 +501,46 @@ class SpawnMineEvent(Event):
     Methods:
         tick(): Advance the event by one tick.
     """
-    def __init__(self, nation: Nation):
+    __slots__ = ("nation", "rng")
+    period = 1
+    skippable = True
+
+    def __init__(self, nation: Nation, rng=None):
         super().__init__()
         self.ticks = sys.maxsize
         self.nation = nation
+        self.rng = rng if rng is not None else np.random.default_rng()
     
     def tick(self):
         self.ticks -= 1
         if self.ticks <= 0:
             self.ticks = sys.maxsize
-        random_prob = np.random.random()
+        random_prob = self.rng.random()
         if random_prob >= self.nation.gold_mine_spawn_rate:
-            print("Gold mine spawned")
+            if event_log.level <= DEBUG:
+                event_log.log(DEBUG, "GoldMineSpawned")
             self.nation.gold_mines += 1
 
 class SpawnAnimalEvent(Event):
+    __slots__ = ("nation", "rng")
+    period = 1
+    skippable = True
 
-    def __init__(self, nation: Nation):
+    def __init__(self, nation: Nation, rng=None):
         super().__init__()
         self.ticks = sys.maxsize
         self.nation = nation
+        self.rng = rng if rng is not None else np.random.default_rng()
     
     def tick(self):
         self.ticks -= 1
         if self.ticks <= 0:
             self.ticks = sys.maxsize
-        random_prob = np.random.random()
+        random_prob = self.rng.random()
         if random_prob >= self.nation.animal_spawn_rate:
-            animal_name = np.random.choice(animal_types)
-            animal = AnimalFactory().create(animal_name)
-            self.nation.animals.append(animal)
-            print(f"{animal_name} spawned")
+            animal_name = self.rng.choice(animal_types)
+            if self.nation.animals.add(animal_name, self.nation.current_time) and event_log.level <= DEBUG:
+                event_log.log(DEBUG, "AnimalSpawned", animal=animal_name)
 
 class UpdateRandomValuesEvent(Event):
     """
@@ -508,18 +553,23 @@ class UpdateRandomValuesEvent(Event):
     Methods:
         tick(): Advance the event by one tick.
     """
-    def __init__(self, enemy_nation: EnemyNation, res: Resources):
+    __slots__ = ("enemy_nation", "res", "rng")
+    period = 1
+    skippable = True
+
+    def __init__(self, enemy_nation: EnemyNation, res: Resources, rng=None):
         super().__init__()
         self.ticks = sys.maxsize
         self.enemy_nation = enemy_nation
         self.res = res
+        self.rng = rng if rng is not None else np.random.default_rng()
     
     def tick(self):
         self.ticks -= 1
         if self.ticks <= 0:
             self.ticks = sys.maxsize
         self.enemy_nation.update_attacks_risk_rate(self.res)
-        self.enemy_nation.update_food_per_combat()
-        self.enemy_nation.update_gold_per_combat()
-        self.enemy_nation.update_units_per_combat()
+        self.enemy_nation.update_food_per_combat(self.rng)
+        self.enemy_nation.update_gold_per_combat(self.rng)
+        self.enemy_nation.update_units_per_combat(self.rng)
         
\ No newline at end of file
@@ -1,45 +1,123 @@
+import heapq
+import time
+from eventlog import event_log
 from events import Event, RestFromAttackEvent
 from models import Nation
 
 class EventHandler():
     """
     Manages and processes events for a nation.
-    
+
+    Events are kept in a priority queue keyed by the tick of the nation's clock
+    when they have to run next. Events that only count down are woken up once,
+    on the tick they finish, while periodic events are pushed back `period`
+    ticks later after each run. A tick only touches the events that are due.
+
     Attributes:
         nation (Nation): The nation instance this handler is managing events for.
-        current_events (list[Event]): The current active events for the nation.
+        current_events (list[Event]): The current active events for the nation, in insertion order.
         attack_running (bool): A flag to determine if an attack event is running.
+        profiler (EventProfiler): Collects per event class statistics when set, None by default.
     """
-    def __init__(self, nation: Nation, current_events: list[Event] = []):
+    def __init__(self, nation: Nation, current_events: list[Event] = None, profiler=None):
         self.nation = nation
-        self.current_events = current_events
         self.attack_running = False
         self.collecting_gold = False
-    
+        self.profiler = profiler
+        self._queue = []  # heap of (due tick, insertion order, event)
+        self._added = 0
+        for event in current_events or []:
+            self._schedule(event)
+
+    @property
+    def current_events(self) -> list[Event]:
+        return [event for _, _, event in sorted(self._queue, key=lambda entry: entry[1])]
+
     def advance_time(self):
         """
-        Progresses the simulation by one time unit, processing all ongoing events
-        and updating the nation's state accordingly.
+        Progresses the simulation by one time unit, processing the events due
+        in this tick and updating the nation's state accordingly.
         """
         removable_events = []
         self.nation.advance_time()
-        for event in self.current_events:
-            event.tick()
-            if event.is_finished():
-                removable_events.append(event)
+        now = self.nation.current_time
+        event_log.tick = now
+        queue = self._queue
+        if self.profiler is not None:
+            self._run_due_events_profiled(now, removable_events)
+        else:
+            while queue and queue[0][0] <= now:
+                _, order, event = heapq.heappop(queue)
+                if event.period is None:
+                    event.complete()
+                else:
+                    event.tick()
+                if event.is_finished():
+                    removable_events.append(event)
+                else:
+                    heapq.heappush(queue, (now + (event.period or 1), order, event))
         for event in removable_events:
-            self.current_events.remove(event)
             if type(event).__name__ == 'AttackEnemiesEvent':
                 self.attack_running = False
                 self.add_event(RestFromAttackEvent(event.combat))
-            
-    
+
+    def _run_due_events_profiled(self, now: int, removable_events: list):
+        # Same as the loop of advance_time, timing every run for the profiler.
+        profiler = self.profiler
+        queue = self._queue
+        clock = time.perf_counter
+        while queue and queue[0][0] <= now:
+            _, order, event = heapq.heappop(queue)
+            start = clock()
+            if event.period is None:
+                event.complete()
+            else:
+                event.tick()
+            profiler.record_tick(event, clock() - start)
+            if event.is_finished():
+                removable_events.append(event)
+                profiler.record_finished(event)
+            else:
+                heapq.heappush(queue, (now + (event.period or 1), order, event))
+        profiler.record_queue(now, len(queue))
+
+    def next_busy_tick(self) -> int:
+        """
+        Returns:
+            int: The next tick when an event that cannot be skipped runs, or None
+            if only skippable periodic events are pending.
+        """
+        return min((due for due, _, event in self._queue if not event.skippable), default=None)
+
+    def skip_to(self, tick: int):
+        """
+        Moves the nation's clock to `tick` without running the skippable
+        periodic events, which are rescheduled from there. The caller is
+        responsible for applying their effect on the skipped ticks.
+        """
+        self.nation.current_time = tick
+        event_log.tick = tick
+        self._queue = [
+            (tick + event.period, order, event) if event.skippable else (due, order, event)
+            for due, order, event in self._queue
+        ]
+        heapq.heapify(self._queue)
+        if self.profiler is not None:
+            self.profiler.record_queue(tick, len(self._queue))
+
     def add_event(self, event: Event):
         """
         Adds a new event to the current events list for the nation.
-        
+
         Args:
             event (Event): The event instance to be added.
         """
-        self.current_events.append(event)
-        self.attack_running = type(event).__name__ == 'AttackEnemiesEvent'
\ No newline at end of file
+        self._schedule(event)
+        self.attack_running = type(event).__name__ == 'AttackEnemiesEvent'
+
+    def _schedule(self, event: Event):
+        delay = event.period if event.period is not None else max(event.ticks, 1)
+        heapq.heappush(self._queue, (self.nation.current_time + delay, self._added, event))
+        self._added += 1
+        if self.profiler is not None:
+            self.profiler.record_created(event)
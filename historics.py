@@ -1,93 +1,489 @@
-import matplotlib.backends.backend_pdf as mpdf
-import matplotlib.pyplot as plt
+import copy
+import numpy as np
+from columns import ColumnStore
+from streaming import open_historics
 
-class StatsCache:
+def _read_row(simulation) -> tuple:
+    """
+    Reads the current value of every recorded column, in the order of `StatsCache.COLUMNS`.
+    """
+    nation = simulation.nation
+    resources = simulation.resources
+    combat = simulation.combat
+    enemy_nation = simulation.enemy_nation
+    battles = simulation.battles
+    return (
+        nation.not_worked_space,
+        nation.used_space,
+        nation.roads_count,
+        nation.population_count,
+        nation.current_busy_population_count,
+        nation.houses_count,
+        len(nation.animals),
+        nation.gold_mines,
+        resources.food_count,
+        resources.gold_count,
+        combat.attack_units_count,
+        combat.defense_units_count,
+        combat.attack_force_rate,
+        combat.resting,
+        enemy_nation.attacks_risk_rate,
+        enemy_nation.gold_per_combat,
+        enemy_nation.food_per_combat,
+        enemy_nation.units_per_combat,
+        battles.attack_wins,
+        battles.attack_losts,
+        battles.defense_wins,
+        battles.defense_losts,
+    )
+
+def _expand(rows: np.ndarray, runs: np.ndarray, ticks: int) -> np.ndarray:
+    # Repeats every row as many ticks as it stands for.
+    return rows if ticks == len(rows) else np.repeat(rows, runs, axis=0)
+
+class StatsCache(ColumnStore):
     """
     Stores historical statistics over time for various attributes of a simulation run.
-    
+
+    Every tick is a row of a ColumnStore with one column per attribute, so
+    recording a tick does not allocate once the run has warmed up. Rows are run-length
+    encoded: a row recorded with `repeat` (see `Simulation.fast_forward`)
+    stands for that many ticks, so skipped stretches take a single row. Each
+    attribute can still be read as `stats_cache.<attribute>`, which returns
+    its column with one value per recorded tick.
+
+    With a sink (see `streaming.HistoricsWriter`) the array is a fixed buffer
+    of `sink.chunk_size` rows that is written to the sink whenever it fills
+    up, so memory stays bounded however long the run is. The sink's file has
+    one row per tick, so repeated rows are written out in full.
+
+    A cache can also start from a read-only `base` of rows recorded before
+    it, which is how `fork` shares the history of a run between its branches.
+
     Methods:
         - update_historics: Updates the historical data based on the current state of the simulation.
-        - plot_attribute: Plots the historical data for a single attribute over time.
+        - to_array: Returns the recorded data as an array of shape (columns, ticks).
+        - to_dataframe: Returns the recorded data as a pandas DataFrame.
+        - fork: Returns caches that continue this one, sharing the rows recorded so far.
+        - flush: Writes the buffered rows to the sink.
+        - close: Flushes and closes the sink.
         - plot_all_attributes: Plots the historical data for all attributes.
     """
-    
+    COLUMNS = (
+        "not_worked_space",
+        "used_space",
+        "roads_count",
+        "population_count",
+        "busy_population_count",
+        "houses_count",
+        "animals",
+        "gold_mines",
+        "food_count",
+        "gold_count",
+        "attack_units",
+        "defense_units",
+        "attack_force_rate",
+        "resting",
+        "attack_risk_rate",
+        "gold_per_combat",
+        "food_per_combat",
+        "units_per_combat",
+        # Combat outcome counters, see `battles.BattleRecorder`.
+        "attack_wins",
+        "attack_losts",
+        "defense_wins",
+        "defense_losts",
+    )
+    # The ticks every row stands for are kept in `_runs`.
+    ROW_ARRAYS = {"_data": 0, "_runs": 1}
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY, sink=None, base: np.ndarray = None, base_runs: np.ndarray = None):
+        if sink is not None:
+            capacity = sink.chunk_size
+        super().__init__(capacity)
+        self._runs = np.ones(len(self._data), dtype=np.int64)
+        self._ticks = 0
+        self._flushed = 0
+        self._base = base if base is not None else np.empty((0, len(StatsCache.COLUMNS)), dtype=np.float64)
+        self._base_runs = base_runs if base_runs is not None else np.ones(len(self._base), dtype=np.int64)
+        self._base_ticks = int(self._base_runs.sum())
+        self.sink = sink
+
+    def __len__(self) -> int:
+        return self._base_ticks + self._flushed + self._ticks
+
+    @property
+    def nbytes(self) -> int:
+        """ Bytes held in memory by the recorded data, not counting a shared base. """
+        return self._data.nbytes + self._runs.nbytes
+
+    def _column(self, index: int) -> np.ndarray:
+        parts = []
+        if len(self._base):
+            parts.append(_expand(self._base[:, index], self._base_runs, self._base_ticks))
+        if self._flushed:
+            parts.append(open_historics(self.sink.path).data[:, index])
+        if self._length or not parts:
+            parts.append(_expand(self._data[:self._length, index], self._runs[:self._length], self._ticks))
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def __getstate__(self):
+        if self.sink is not None:
+            raise ValueError("A StatsCache streaming to a sink cannot be pickled")
+        return super().__getstate__()
+
+    def update_historics(self, simulation, repeat: int = 1):
+        """
+        Pulls the current data from the simulation and appends it as a new row.
+
+        Args:
+            simulation (object): The current state of the simulation.
+            repeat (int): Number of ticks the current data lasted. The row is
+                written once, as a run of that many ticks, or that many times
+                with a sink.
+        """
+        row = _read_row(simulation)
+        if self.sink is None:
+            if repeat <= 0:
+                return
+            length = self._length
+            if length == len(self._data):
+                self._grow()
+            self._data[length] = row
+            if repeat != 1:
+                self._runs[length] = repeat
+            self._length = length + 1
+            self._ticks += repeat
+            return
+        while repeat > 0:
+            length = self._length
+            if length == len(self._data):
+                self.flush()
+                length = 0
+            count = min(repeat, len(self._data) - length)
+            self._data[length:length + count] = row
+            self._length = length + count
+            self._ticks += count
+            repeat -= count
+
+    def fork(self, n: int) -> list:
+        """
+        Returns `n` caches that continue this one. The rows recorded so far
+        become a read-only base shared by this cache and the new ones, so they
+        are not copied, and every cache appends its own rows after them.
+
+        Raises:
+            ValueError: If the cache streams to a sink.
+        """
+        if self.sink is not None:
+            raise ValueError("A StatsCache streaming to a sink cannot be forked")
+        if self._length:
+            rows, runs = self._data[:self._length], self._runs[:self._length]
+            self._base = np.concatenate((self._base, rows)) if len(self._base) else rows
+            self._base_runs = np.concatenate((self._base_runs, runs)) if len(self._base_runs) else runs
+            self._base.flags.writeable = False
+            self._base_runs.flags.writeable = False
+            self._base_ticks += self._ticks
+            self._data = np.zeros((StatsCache.INITIAL_CAPACITY, len(StatsCache.COLUMNS)), dtype=np.float64)
+            self._runs = np.ones(StatsCache.INITIAL_CAPACITY, dtype=np.int64)
+            self._length = 0
+            self._ticks = 0
+        return [StatsCache(base=self._base, base_runs=self._base_runs) for _ in range(n)]
+
+    def flush(self):
+        if self.sink is None or self._length == 0:
+            return
+        self.sink.write(self._data[:self._length])
+        self._flushed += self._length
+        self._length = 0
+        self._ticks = 0
+
+    def close(self):
+        if self.sink is not None:
+            self.flush()
+            self.sink.close()
+
+    def to_array(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: The recorded data, shape (len(COLUMNS), ticks). Without a
+            sink, a base or repeated rows this is a view of the cache, otherwise
+            the rows are expanded and joined.
+        """
+        rows = _expand(self._data[:self._length], self._runs[:self._length], self._ticks)
+        if self._flushed:
+            rows = np.concatenate((open_historics(self.sink.path).data, rows))
+        if len(self._base):
+            rows = np.concatenate((_expand(self._base, self._base_runs, self._base_ticks), rows))
+        return rows.T
+
+    def to_dataframe(self):
+        """
+        Returns:
+            pandas.DataFrame: The recorded data, one column per attribute and one row per tick.
+
+        Raises:
+            ImportError: If pandas is not installed.
+        """
+        import pandas as pd
+
+        return pd.DataFrame(self.to_array().T, columns=StatsCache.COLUMNS)
+
+    def plot_all_attributes(self, output: str = 'simulation_plots.pdf', raster: bool = False, workers: int = None):
+        """
+        Plots the historical data of all attributes into a PDF, one page per
+        attribute, see `plotting.render_historics`. Long series are decimated.
+        With `raster`, the pages are rendered as images in parallel and pages
+        whose data did not change since the last call are reused.
+
+        Args:
+            output (str): Path of the PDF.
+            raster (bool): Whether to render the pages as cached images instead of vector graphics.
+            workers (int): Worker processes rendering the pages with `raster`.
+        """
+        # matplotlib takes most of the import time of the engine, so it is only
+        # loaded when something is plotted.
+        from plotting import render_historics
+
+        render_historics(self, output, raster=raster, workers=workers)
+
+class SummaryStatsCache:
+    """
+    Keeps only summary statistics of a simulation run: the min, max, mean,
+    standard deviation and last value of every column of `StatsCache.COLUMNS`.
+    It can replace a StatsCache when the per-tick series are not needed.
+
+    The mean and variance are running accumulators. Rows are first written to
+    a small fixed block, like a StatsCache row, and every full block is folded
+    into the accumulators with the parallel form of Welford's algorithm (Chan
+    et al.), so memory stays constant however long the run is and recording a
+    tick stays as cheap as with a StatsCache.
+
+    Methods:
+        - update_historics: Adds the current data of the simulation to the statistics.
+        - summary: Returns the statistics of every column.
+        - to_array: Returns the statistics as an array of shape (columns, FIELDS).
+        - fork: Returns copies that continue this one.
+        - flush, close: Do nothing, there is no sink.
+    """
+    COLUMNS = StatsCache.COLUMNS
+    FIELDS = ("min", "max", "mean", "std", "last")
+    BLOCK_SIZE = 256
+
     def __init__(self):
-        self.not_worked_space = []
-        self.used_space = []
-        self.roads_count = []
-        self.population_count = []
-        self.busy_population_count = []
-        self.houses_count = []
-        self.animals = []
-        self.gold_mines = []
-        self.food_count = []
-        self.gold_count = []
-        self.attack_units = []
-        self.defense_units = []
-        self.attack_force_rate = []
-        self.resting = []
-        self.attack_risk_rate = []
-        self.gold_per_combat = []
-        self.food_per_combat = []
-        self.units_per_combat = []
-        self.attack_wins = []
-        self.attack_losts = []
-        self.defense_wins = []
-        self.defense_losts = []
-    
-    def update_historics(self, simulation):
-        """
-        Pulls the current data from the simulation and appends it to the historical lists.
-        
+        self.sink = None
+        self._count = 0
+        self._min = np.full(len(self.COLUMNS), np.inf)
+        self._max = np.full(len(self.COLUMNS), -np.inf)
+        self._mean = np.zeros(len(self.COLUMNS))
+        self._m2 = np.zeros(len(self.COLUMNS))
+        self._last = np.zeros(len(self.COLUMNS))
+        self._block = np.zeros((self.BLOCK_SIZE, len(self.COLUMNS)))
+        self._weights = np.zeros(self.BLOCK_SIZE)
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._count + int(self._weights[:self._length].sum())
+
+    @property
+    def nbytes(self) -> int:
+        return self._block.nbytes + self._weights.nbytes + self._min.nbytes * 5
+
+    def update_historics(self, simulation, repeat: int = 1):
+        """
+        Pulls the current data from the simulation and adds it to the statistics.
+
         Args:
             simulation (object): The current state of the simulation.
+            repeat (int): Number of ticks the current data lasted. The row is
+                added once, weighted by `repeat`.
+        """
+        if repeat <= 0:
+            return
+        row = _read_row(simulation)
+        self._block[self._length] = row
+        self._weights[self._length] = repeat
+        self._length += 1
+        if self._length == self.BLOCK_SIZE:
+            self._fold()
+
+    def _fold(self):
+        length = self._length
+        if not length:
+            return
+        rows, weights = self._block[:length], self._weights[:length]
+        total = weights.sum()
+        mean = weights @ rows / total
+        deviations = rows - mean
+        m2 = weights @ (deviations * deviations)
+        count = self._count + total
+        delta = mean - self._mean
+        self._mean += delta * (total / count)
+        self._m2 += m2 + delta * delta * (self._count * total / count)
+        np.minimum(self._min, rows.min(axis=0), out=self._min)
+        np.maximum(self._max, rows.max(axis=0), out=self._max)
+        self._last[:] = rows[-1]
+        self._count = int(count)
+        self._length = 0
+
+    def summary(self) -> dict:
+        """
+        Returns:
+            dict: Per column, a dict with the statistics of `FIELDS`.
+        """
+        values = self.to_array()
+        return {name: dict(zip(self.FIELDS, row.tolist())) for name, row in zip(self.COLUMNS, values)}
+
+    def to_array(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: The statistics, shape (len(COLUMNS), len(FIELDS)). They
+            are NaN before the first update.
+        """
+        self._fold()
+        if not self._count:
+            return np.full((len(self.COLUMNS), len(self.FIELDS)), np.nan)
+        std = np.sqrt(self._m2 / self._count)
+        return np.stack((self._min, self._max, self._mean, std, self._last), axis=1)
+
+    def fork(self, n: int) -> list:
+        return [copy.deepcopy(self) for _ in range(n)]
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+class TieredStatsCache:
+    """
+    Keeps the historics of a simulation run at several resolutions: every
+    tick of the last `recent` ticks, and older ticks rolled up into buckets
+    that keep the min, max and mean of every column. Buckets of the first
+    tier span `factor` ticks, and every tier holds at most `buckets` of them
+    before its oldest ones are merged into the next tier, whose buckets are
+    `factor` times longer (10, 100, 1000... ticks with the defaults). Memory
+    grows with the logarithm of the run's length, and the whole run can still
+    be plotted.
+
+    Recent ticks are written as rows of a preallocated array, like a
+    StatsCache, and rolled up `recent` ticks at a time once it is full.
+
+    Methods:
+        - update_historics: Updates the historical data based on the current state of the simulation.
+        - ranges: Returns the first tick, min, max and mean of every bucket.
+        - to_array: Returns the mean of every bucket as an array of shape (columns, buckets).
+        - fork: Returns copies that continue this one.
+        - flush, close: Do nothing, there is no sink.
+        - plot_all_attributes: Plots the historical data for all attributes.
+    """
+    COLUMNS = StatsCache.COLUMNS
+
+    def __init__(self, recent: int = 1000, buckets: int = 100, factor: int = 10):
+        if factor < 2 or recent <= 0 or recent % factor or buckets < factor:
+            raise ValueError("recent has to be a multiple of factor, and buckets at least factor")
+        self.sink = None
+        self.recent = recent
+        self.buckets = buckets
+        self.factor = factor
+        self._data = np.zeros((2 * recent, len(self.COLUMNS)), dtype=np.float64)
+        self._length = 0
+        self._rolled = 0
+        # Per tier, the (min, max, mean) rows of its buckets, shape (buckets, 3, columns), oldest first.
+        self._tiers = []
+
+    def __len__(self) -> int:
+        return self._rolled + self._length
+
+    @property
+    def nbytes(self) -> int:
+        return self._data.nbytes + sum(tier.nbytes for tier in self._tiers)
+
+    def update_historics(self, simulation, repeat: int = 1):
         """
-        self.not_worked_space.append(simulation.nation.not_worked_space)
-        self.used_space.append(simulation.nation.used_space)
-        self.roads_count.append(simulation.nation.roads_count)
-        self.population_count.append(simulation.nation.population_count)
-        self.busy_population_count.append(simulation.nation.current_busy_population_count)
-        self.houses_count.append(simulation.nation.houses_count)
-        self.animals.append(len(simulation.nation.animals))
-        self.gold_mines.append(simulation.nation.gold_mines)
-        self.food_count.append(simulation.resources.food_count)
-        self.gold_count.append(simulation.resources.gold_count)
-        self.attack_units.append(simulation.combat.attack_units_count)
-        self.defense_units.append(simulation.combat.defense_units_count)
-        self.attack_force_rate.append(simulation.combat.attack_force_rate)
-        self.resting.append(simulation.combat.resting)
-        self.attack_risk_rate.append(simulation.enemy_nation.attacks_risk_rate)
-        self.gold_per_combat.append(simulation.enemy_nation.gold_per_combat)
-        self.food_per_combat.append(simulation.enemy_nation.food_per_combat)
-        self.units_per_combat.append(simulation.enemy_nation.units_per_combat)
-
-    def plot_attribute(self, pdf_pages, attribute_name, title):
-        """
-        Plots a specific attribute's historical data.
-        
+        Pulls the current data from the simulation and appends it as a new row.
+
         Args:
-            attribute_name (str): The attribute to plot.
-            title (str): Title for the plot.
-        """
-        values = getattr(self, attribute_name)
-        time = list(range(1, len(values) + 1))
-
-        plt.figure(figsize=(10, 6))
-        plt.plot(time, values, marker='o', linestyle='-', label=attribute_name)
-        plt.title(title)
-        plt.xlabel("Minutes (Time)")
-        plt.ylabel("Value")
-        plt.grid(True)
-        plt.legend()
-        pdf_pages.savefig()
-        plt.close()
-
-    def plot_all_attributes(self):
-        """
-        Iterates over all attributes and plots their historical data.
-        """
-        pdf_pages = mpdf.PdfPages('simulation_plots.pdf')  # PDF file to save the plots
-        for attribute_name in dir(self):
-            if not attribute_name.startswith("__") and not callable(getattr(self, attribute_name)):
-                self.plot_attribute(pdf_pages, attribute_name, f"{attribute_name} over Time")
-        pdf_pages.close()  # Close the PDF after saving all the plots
\ No newline at end of file
+            simulation (object): The current state of the simulation.
+            repeat (int): Number of ticks the current data lasted. The row is
+                written that many times, as a run-length fill.
+        """
+        row = _read_row(simulation)
+        while repeat > 0:
+            if self._length == len(self._data):
+                self._roll()
+            length = self._length
+            count = min(repeat, len(self._data) - length)
+            self._data[length:length + count] = row
+            self._length = length + count
+            repeat -= count
+
+    def _roll(self):
+        # The oldest ticks beyond `recent` become buckets of the first tier.
+        count = self._length - self.recent
+        ticks = self._data[:count].reshape(count // self.factor, self.factor, len(self.COLUMNS))
+        self._push(0, np.stack((ticks.min(axis=1), ticks.max(axis=1), ticks.mean(axis=1)), axis=1))
+        self._data[:self.recent] = self._data[count:self._length]
+        self._length = self.recent
+        self._rolled += count
+
+    def _push(self, level: int, buckets: np.ndarray):
+        if level == len(self._tiers):
+            self._tiers.append(buckets[:0])
+        tier = np.concatenate((self._tiers[level], buckets))
+        excess = len(tier) - self.buckets
+        if excess > 0:
+            merged = -(-excess // self.factor) * self.factor
+            groups = tier[:merged].reshape(merged // self.factor, self.factor, 3, len(self.COLUMNS))
+            # Buckets of a tier all span the same number of ticks, so means merge evenly.
+            self._push(level + 1, np.stack((groups[:, :, 0].min(axis=1), groups[:, :, 1].max(axis=1), groups[:, :, 2].mean(axis=1)), axis=1))
+            tier = tier[merged:].copy()
+        self._tiers[level] = tier
+
+    def ranges(self) -> tuple:
+        """
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: The first tick
+            (starting at 1) of every bucket, oldest first, and the min, max and
+            mean of every column in it, shape (len(COLUMNS), buckets). The recent
+            ticks are buckets of a single tick.
+        """
+        times, parts = [], []
+        start = 1
+        for level in reversed(range(len(self._tiers))):
+            tier, span = self._tiers[level], self.factor ** (level + 1)
+            times.append(start + span * np.arange(len(tier)))
+            parts.append(tier)
+            start += span * len(tier)
+        rows = self._data[:self._length]
+        times.append(start + np.arange(self._length))
+        parts.append(np.stack((rows, rows, rows), axis=1))
+        values = np.concatenate(parts)
+        return np.concatenate(times), values[:, 0].T, values[:, 1].T, values[:, 2].T
+
+    def to_array(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: The mean of every bucket, shape (len(COLUMNS), buckets),
+            see `ranges` for their ticks.
+        """
+        return self.ranges()[3]
+
+    def fork(self, n: int) -> list:
+        return [copy.deepcopy(self) for _ in range(n)]
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def plot_all_attributes(self, output: str = 'simulation_plots.pdf', raster: bool = False, workers: int = None):
+        """
+        Plots the historical data of all attributes into a PDF, drawing the
+        range of every bucket, see `StatsCache.plot_all_attributes`.
+        """
+        from plotting import render_historics
+
+        render_historics(self, output, raster=raster, workers=workers)
@@ -1,70 +1,263 @@
-import yaml
+import argparse
 from dataclasses import asdict
+from config import load_config
+from eventlog import event_log, ConsoleSink, JsonlFileSink, LEVELS, DEBUG, OFF
 from models import Nation, Resources, Combat, ResearchAndDevelopment, EnemyNation
+from historics import StatsCache, SummaryStatsCache, TieredStatsCache
+from profiling import EventProfiler
 from simulation import Simulation
+from streaming import HistoricsWriter
+from utils import ConfigError
 
-def create_models_from_yml():
+def create_models_from_yml(path='models.yml', overrides=None):
     """
     Reads data from 'models.yml', processes it, and creates model instances.
+
+    The file is parsed and validated once, see `config.load_config`, later
+    calls only build new instances from it.
+
+    Args:
+        path (str): Path of the YAML file with the models' data.
+        overrides (dict): Values replacing the ones of the file, keyed by
+            dotted field, e.g. {"enemy_nation.attack_coefficient": 0.5}.
     
     Returns:
         tuple: A tuple containing instances of Nation, Resources, Combat, 
         ResearchAndDevelopment, and EnemyNation. If any data is missing from the
         YAML, the respective instance will be None.
+
+    Raises:
+        ConfigError: If the data does not match the models.
     """
-    print("Loading values from models.yml")
-    with open('models.yml', 'r') as file:
-        data = yaml.safe_load(file)
+    print(f"Loading values from {path}")
+    return load_config(path).build(overrides)
 
-        nation_data = data.get("nation")
-        resources_data = data.get("resources")
-        combat_data = data.get("combat")
-        research_and_dev_data = data.get("research_and_dev")
-        enemy_nation_data = data.get("enemy_nation")
+def load_actions_from_yml(path):
+    """
+    Reads an action schedule for headless runs from a YAML file.
 
-        nation_instance = Nation(**nation_data) if nation_data else None
-        resources_instance = Resources(**resources_data) if resources_data else None
-        combat_instance = Combat(**combat_data) if combat_data else None
-        research_and_dev_instance = ResearchAndDevelopment(**research_and_dev_data) if research_and_dev_data else None
-        enemy_nation_instance = EnemyNation(**enemy_nation_data) if enemy_nation_data else None
+    The file maps ticks to lists of actions, where an action is an event name
+    or a [event name, argument] pair, e.g. `3: [MineGold, [HuntAnimal, Deer]]`.
+    A tick with a single event name, e.g. `5: MineGold`, has that one action.
 
-        return nation_instance, resources_instance, combat_instance, research_and_dev_instance, enemy_nation_instance
+    Returns:
+        dict: The schedule, ready for `Simulation.run_batch`.
 
-def main():
+    Raises:
+        ConfigError: If a tick is not mapped to an event name or a list of actions.
+    """
+    import yaml
+
+    with open(path, 'r') as file:
+        data = yaml.safe_load(file) or {}
+    schedule = {}
+    for tick, actions in data.items():
+        if actions is None:
+            actions = []
+        elif isinstance(actions, str):
+            actions = [actions]
+        elif not isinstance(actions, list):
+            raise ConfigError(f"Actions of tick {tick} in {path} must be an event name or a list of actions")
+        schedule[int(tick)] = [tuple(action) if isinstance(action, list) else action for action in actions]
+    return schedule
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="DomiNations simulation")
+    parser.add_argument("--models", default="models.yml", help="YAML file with the models' data")
+    parser.add_argument("--batch", type=int, metavar="TICKS", help="run headless for TICKS ticks instead of the interactive menu")
+    parser.add_argument("--actions", metavar="FILE", help="YAML action schedule used by --batch")
+    parser.add_argument("--no-plots", action="store_true", help="do not save the graphs at the end of a --batch run")
+    parser.add_argument("--raster-plots", action="store_true", help="render the graphs as cached images in parallel, faster "
+                                                                     "for long or repeated runs, instead of a vector PDF")
+    parser.add_argument("--fast-forward", action="store_true", help="skip idle stretches of a --batch run instead of running every tick")
+    parser.add_argument("--stats", choices=["full", "tiered", "summary"], default="full",
+                        help="keep the historics of every tick of a --batch or --replicas run, only the last 1000 ticks with older ones "
+                             "rolled up into coarser buckets (--batch only), or only their min, max, mean, std and last value")
+    parser.add_argument("--historics-file", metavar="FILE", help="stream the historics of a --batch run to FILE instead of keeping them in memory")
+    parser.add_argument("--battles", metavar="FILE", help="save the record of every battle of a --batch run to FILE (.npz)")
+    parser.add_argument("--snapshot", metavar="FILE", help="save the state of the simulation to FILE at the end of a --batch run")
+    parser.add_argument("--restore", metavar="FILE", help="continue the simulation saved in FILE instead of loading --models")
+    parser.add_argument("--profile", metavar="FILE", help="write the per event class tick costs and queue length of the run to FILE as JSON")
+    parser.add_argument("--log-level", choices=LEVELS, help="level of the event log, defaults to debug for the interactive menu and off for --batch")
+    parser.add_argument("--log-file", metavar="FILE", help="append the event log to FILE as JSON lines instead of printing it")
+    parser.add_argument("--replicas", type=int, help="run an ensemble of REPLICAS independent --batch runs, or runs per config of sweep (10 by default)")
+    parser.add_argument("--workers", type=int, help="worker processes used by --replicas and sweep")
+    parser.add_argument("--seed", type=int, help="seed of the run, root seed of the --replicas ensemble or of sweep, seed of bench (0 by default)")
+    parser.add_argument("--output", help="file where the --replicas statistics (ensemble_stats.npz by default) or the bench results "
+                                         "(benchmark_results.json by default) are saved")
+    parser.add_argument("--fan-charts", action="store_true", help="aggregate the --replicas runs as they finish, keeping 1000 ticks, and plot them as fan charts")
+    parser.add_argument("--engine", choices=["object", "vectorized"], default="object", help="engine used by --replicas and sweep")
+    subparsers = parser.add_subparsers(dest="command")
+    # Options shared with the main parser can be given before or after the
+    # command. Their copies have no default, so they do not override a value
+    # given before the command.
+    bench = subparsers.add_parser("bench", help="run the benchmark scenarios and write their results to JSON")
+    bench.add_argument("scenarios", nargs="*", metavar="SCENARIO", help="scenarios to run, all of them by default")
+    bench.add_argument("--ticks", type=int, help="ticks of every scenario instead of their own")
+    bench.add_argument("--models", default=argparse.SUPPRESS, help="YAML file with the models' data")
+    bench.add_argument("--seed", type=int, default=argparse.SUPPRESS, help="seed of the benchmark runs, 0 by default")
+    bench.add_argument("--output", default=argparse.SUPPRESS, help="JSON file where the results are written, benchmark_results.json by default")
+    sweep = subparsers.add_parser("sweep", help="run an ensemble for every config of a sweep over the models' fields")
+    sweep.add_argument("spec", help="YAML file with the grid or Latin hypercube of the sweep")
+    sweep.add_argument("--ticks", type=int, required=True, help="ticks of every run")
+    sweep.add_argument("--output-dir", default="sweep", help="directory of the per config results and of the results table")
+    sweep.add_argument("--models", default=argparse.SUPPRESS, help="YAML file with the models' data")
+    sweep.add_argument("--actions", default=argparse.SUPPRESS, metavar="FILE", help="YAML action schedule of every run")
+    sweep.add_argument("--replicas", type=int, default=argparse.SUPPRESS, help="runs per config, 10 by default")
+    sweep.add_argument("--seed", type=int, default=argparse.SUPPRESS, help="root seed of every ensemble, 0 by default")
+    sweep.add_argument("--workers", type=int, default=argparse.SUPPRESS, help="worker processes of every ensemble")
+    sweep.add_argument("--engine", choices=["object", "vectorized"], default=argparse.SUPPRESS, help="engine of every ensemble")
+    return parser.parse_args(argv)
+
+def configure_event_log(args):
+    if args.log_level is not None:
+        level = LEVELS[args.log_level]
+    elif args.batch is not None and not args.log_file:
+        level = OFF
+    else:
+        level = DEBUG
+    sink = JsonlFileSink(args.log_file) if args.log_file else ConsoleSink()
+    event_log.configure(sink, level)
+
+def save_profile(args, profiler):
+    if profiler is not None:
+        print(f"Saving event profile to '{args.profile}' file")
+        profiler.save(args.profile)
+
+def run_ensemble_from_args(args, actions):
+    from ensemble import run_ensemble
+
+    if args.stats == "tiered":
+        raise SystemExit("--stats tiered cannot be used with --replicas")
+    if args.stats == "summary" and (args.fan_charts or args.engine != "object"):
+        raise SystemExit("--stats summary cannot be used with --fan-charts or the vectorized engine")
+    result = run_ensemble(args.replicas, args.batch, actions, models_path=args.models, seed=args.seed, workers=args.workers, engine=args.engine,
+                          online=args.fan_charts, points=1000 if args.fan_charts else None, stats=args.stats)
+    print(f"Ensemble of {result.replicas} runs finished. Statistics at the last tick:")
+    for name in result.metrics:
+        stats = result.metric(name)
+        print(f"{name}: mean {stats['mean'][-1]:.2f}, std {stats['std'][-1]:.2f}")
+    output = args.output or "ensemble_stats.npz"
+    print(f"Saving statistics to '{output}' file")
+    result.save(output)
+    if args.fan_charts:
+        from plotting import render_fan_charts
+
+        print("Saving fan charts to 'ensemble_plots.pdf' file")
+        render_fan_charts(result, 'ensemble_plots.pdf', raster=args.raster_plots, workers=args.workers)
+
+def main(argv=None):
     """
     Main function to run the script. It fetches model data from 'models.yml' 
-    and prints the corresponding instances. This serves as a basic demonstration
-    of how the models can be populated from the YAML.
+    and runs the simulation, either through the interactive menu or headless
+    when `--batch` is given.
     """
-    nation, resources, combat, research_and_dev, enemy_nation = create_models_from_yml()
-    simulation = Simulation(nation=nation, resources=resources, combat=combat, research_and_dev=research_and_dev, enemy_nation=enemy_nation)
-    simulation.run()
+    args = parse_args(argv)
+    if args.command == "bench":
+        from benchmarks import SCENARIOS, run_benchmarks, print_benchmarks
+
+        unknown = set(args.scenarios) - set(SCENARIOS)
+        if unknown:
+            raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}. Choose from {', '.join(SCENARIOS)}")
+        output = args.output or "benchmark_results.json"
+        seed = args.seed if args.seed is not None else 0
+        print_benchmarks(run_benchmarks(args.scenarios, args.models, seed, args.ticks, output))
+        print(f"Results saved to '{output}' file")
+        return
+    if args.command == "sweep":
+        from sweep import load_sweep_spec, run_sweep
+
+        actions = load_actions_from_yml(args.actions) if args.actions else {}
+        table = run_sweep(load_sweep_spec(args.spec), args.ticks, args.replicas or 10, args.output_dir, args.models,
+                          actions, seed=args.seed or 0, workers=args.workers, engine=args.engine)
+        print(f"Sweep of {len(table['config'])} configs saved to '{args.output_dir}' directory")
+        return
+    if args.replicas is not None:
+        if args.batch is None:
+            raise SystemExit("--replicas needs the number of ticks given with --batch")
+        run_ensemble_from_args(args, load_actions_from_yml(args.actions) if args.actions else {})
+        return
+    if args.historics_file and (args.snapshot or args.restore):
+        raise SystemExit("--historics-file cannot be used with --snapshot or --restore")
+    if args.restore and args.seed is not None:
+        raise SystemExit("--seed cannot be used with --restore, a restored simulation continues the random streams of its snapshot")
+    if args.stats != "full" and (args.batch is None or args.historics_file or args.restore):
+        raise SystemExit(f"--stats {args.stats} needs --batch and cannot be used with --historics-file or --restore")
+    configure_event_log(args)
+    profiler = EventProfiler() if args.profile else None
+    if args.restore:
+        print(f"Restoring simulation from {args.restore}")
+        simulation = Simulation.restore(args.restore)
+        simulation.event_handler.profiler = profiler
+    else:
+        nation, resources, combat, research_and_dev, enemy_nation = create_models_from_yml(args.models)
+        stats_cache = None
+        if args.batch is not None and args.historics_file:
+            stats_cache = StatsCache(sink=HistoricsWriter(args.historics_file, StatsCache.COLUMNS))
+        elif args.stats == "summary":
+            stats_cache = SummaryStatsCache()
+        elif args.stats == "tiered":
+            stats_cache = TieredStatsCache()
+        simulation = Simulation(nation=nation, resources=resources, combat=combat, research_and_dev=research_and_dev, enemy_nation=enemy_nation, stats_cache=stats_cache, seed=args.seed, profiler=profiler)
+    if args.batch is None:
+        simulation.run()
+        save_profile(args, profiler)
+        event_log.close()
+        return
+    actions = load_actions_from_yml(args.actions) if args.actions else {}
+    rejected = simulation.run_batch(args.batch, actions, fast_forward=args.fast_forward)
+    for tick, action, reason in rejected:
+        print(f"Tick {tick}: {action} rejected. {reason}")
+    print(f"Simulation advanced {args.batch} ticks.")
+    if args.battles:
+        print(f"Saving {len(simulation.battles)} battles to '{args.battles}' file")
+        simulation.battles.save(args.battles)
+    if args.snapshot:
+        print(f"Saving simulation to '{args.snapshot}' file")
+        simulation.snapshot(args.snapshot)
+    if isinstance(simulation.stats_cache, SummaryStatsCache):
+        for name, stats in simulation.stats_cache.summary().items():
+            print(f"{name}: " + ", ".join(f"{field} {value:.2f}" for field, value in stats.items()))
+    elif not args.no_plots:
+        print("Saving graphs to 'simulation_plots.pdf' file")
+        simulation.stats_cache.plot_all_attributes(raster=args.raster_plots)
+    simulation.stats_cache.close()
+    save_profile(args, profiler)
+    event_log.close()
 
 def create_default_yml_file():
     """
     Generates a 'models.yml' file with default data. This can be used as a sample
     or as a reset to a default state.
     """
-    nation = Nation("Sample Nation", 0, 100, 20, 80, 0.5, 0.3, 50, 200, 10, 5, 5, 50, 10, [])
+    nation = Nation("Sample Nation", 0, 100, 20, 80, 0.5, 0.3, 50, 200, 10, 5, 5, 50, 10)
     resources = Resources(100, 50, [])
     combat = Combat(200, 100, 300, 250, 10, 7, 400, 300, 6, False)
     research_and_dev = ResearchAndDevelopment(2, 5, 15, 20)
     enemy_nation = EnemyNation(0.6, 0.8, 0.7, 100, 10, 50, 5, 30, 10, 20, 0, 0, 0)
 
     # Define a dictionary with the instances
+    nation_data = asdict(nation)
+    nation_data["animals"] = nation.animals.to_list()
+    del nation_data["buildings"]
     data = {
-        "nation": asdict(nation),
+        "nation": nation_data,
         "resources": asdict(resources),
         "combat": asdict(combat),
         "research_and_dev": asdict(research_and_dev),
         "enemy_nation": asdict(enemy_nation)
     }
 
+    import yaml
+
     # Write the dictionary to a YAML file
     with open('models.yml', 'w') as file:
         yaml.dump(data, file)
 
 if __name__ == "__main__":
     print("Initializating simulation")
-    main()
+    try:
+        main()
+    except ConfigError as e:
+        raise SystemExit(f"Invalid configuration: {e}")
     # create_default_yml_file()
\ No newline at end of file
@@ -1,8 +1,24 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import lru_cache
 import events
-from entities import  building_types, Building
+from entities import  building_types, Building, AnimalInventory, BuildingRegistry
 import numpy as np
 
+@lru_cache(maxsize=256)
+def cost_table(seed: int, low: float, high: float) -> dict:
+    """
+    Draws the (gold_cost, food_cost) of every building type for a seed. The
+    result only depends on the arguments, so it is computed once and kept in
+    a bounded LRU cache. The returned dict is shared and must not be modified.
+    """
+    rng = np.random.default_rng(seed)
+    table = {}
+    for building in building_types:
+        food_cost = rng.uniform(low, high)
+        gold_cost = rng.uniform(low, high)
+        table[building] = (gold_cost, food_cost)
+    return table
+
 @dataclass
 class Nation():
     """
@@ -23,8 +39,10 @@ class Nation():
         mine_time (int): Time required for mining.
         current_busy_population_count (int): Count of population currently engaged.
         houses_count (int): Number of houses in the nation.
-        animals (list): List of animals in the nation.
+        animals (AnimalInventory): Animals in the nation. A list of animal names is converted.
         gold_mines (int): Number of gold mines in the nation.
+        max_animals (int): Maximum number of animals the nation keeps, None for no limit.
+        buildings (BuildingRegistry): Index of the improvable buildings of the nation.
 
     Methods:
         advance_time(): Increment the current time by 1.
@@ -49,8 +67,15 @@ class Nation():
     mine_time: int
     current_busy_population_count: int
     houses_count: int
-    animals = []
+    animals: AnimalInventory = field(default_factory=AnimalInventory)
     gold_mines: int = 0
+    max_animals: int = None
+    buildings: BuildingRegistry = field(default_factory=BuildingRegistry, repr=False)
+
+    def __post_init__(self):
+        if not isinstance(self.animals, AnimalInventory):
+            self.animals = AnimalInventory(self.animals)
+        self.animals.capacity = self.max_animals
 
     def advance_time(self):
         self.current_time += 1
@@ -141,8 +166,8 @@ class Combat():
     defense_force_rate: float
     training_time: int
     resting: bool = False
-    attack_buildings: list[Building]
-    defense_buildings: list[Building]
+    attack_buildings: list[Building] = field(default_factory=list)
+    defense_buildings: list[Building] = field(default_factory=list)
 
     def show_status(self):
         status = "Combat\n"
@@ -160,7 +185,7 @@ class Combat():
     
     def calculate_attack_and_defense_rates(self):
         self.attack_force_rate = (self.attack_units_count * 1.5) + (self.attack_buildings_count * 10)
-        self.defense_force_rate = (self.defense_units_count * 0.8) + (self.defense_buildings * 12)
+        self.defense_force_rate = (self.defense_units_count * 0.8) + (self.defense_buildings_count * 12)
 
 @dataclass
 class ResearchAndDevelopment():
@@ -189,26 +214,13 @@ class ResearchAndDevelopment():
     Returns (gold_cost, food_cost)
     """
     def calculate_building_cost(self, building_type: str, seed: int) -> tuple[int]:
-        rng = np.random.default_rng(seed)
-        type_cost = (0, 0)
-        for building in building_types:
-            food_cost = rng.uniform(50, 200)
-            gold_cost = rng.uniform(50, 200)
-            if building_type == building:
-                type_cost = (gold_cost, food_cost)
-        return type_cost
+        return cost_table(seed, 50, 200).get(building_type, (0, 0))
     """
     Returns (gold_cost, food_cost)
     """
     def calculate_improvement_cost(self, building_type: str, seed: int) -> tuple[int]:
-        rng = np.random.default_rng(seed)
-        type_cost = (0, 0)
-        for building in building_types:
-            food_cost = rng.uniform(300, 500)
-            gold_cost = rng.uniform(300, 500)
-            if building_type == building:
-                type_cost = (int(gold_cost), int(food_cost))
-        return type_cost
+        gold_cost, food_cost = cost_table(seed, 300, 500).get(building_type, (0, 0))
+        return (int(gold_cost), int(food_cost))
     
     def create_building(self, event_handler, nation, res, combat: Combat, building_type: str, seed: int):
         event = events.BuildBuilding(nation, self, res, combat, building_type,  seed)
@@ -247,10 +259,11 @@ class EnemyNation():
         units_per_combat (int): Units per combat.
 
     Methods:
+        next_attacks_risk_rate(resources): Get the risk rate of attacks after an update, without changing it.
         update_attacks_risk_rate(resources): Update the risk rate of attacks based on available resources.
-        update_gold_per_combat(): Update the gold cost per combat.
-        update_food_per_combat(): Update the food cost per combat.
-        update_units_per_combat(): Update the units per combat.
+        update_gold_per_combat(rng): Update the gold cost per combat.
+        update_food_per_combat(rng): Update the food cost per combat.
+        update_units_per_combat(rng): Update the units per combat.
         show_status(): Display the status of the enemy nation.
     """
     attack_coefficient: float
@@ -267,20 +280,22 @@ class EnemyNation():
     gold_per_combat: int = 0
     units_per_combat: int = 0
 
-    def update_attacks_risk_rate(self, resources):
+    def next_attacks_risk_rate(self, resources) -> float:
         if resources.food_count <= 0 or resources.gold_count <= 0:
-            self.attacks_risk_rate += 0.01
-        else:
-            self.attacks_risk_rate = max(0.01, self.attacks_risk_rate - (resources.food_count + resources.gold_count) * 0.0001)
+            return self.attacks_risk_rate + 0.01
+        return max(0.01, self.attacks_risk_rate - (resources.food_count + resources.gold_count) * 0.0001)
+
+    def update_attacks_risk_rate(self, resources):
+        self.attacks_risk_rate = self.next_attacks_risk_rate(resources)
     
-    def update_gold_per_combat(self):
-        self.gold_per_combat = int(np.random.normal(self.gold_per_combat_mean, self.gold_per_combat_std))
+    def update_gold_per_combat(self, rng=np.random):
+        self.gold_per_combat = int(rng.normal(self.gold_per_combat_mean, self.gold_per_combat_std))
     
-    def update_food_per_combat(self):
-        self.food_per_combat = int(np.random.normal(self.food_per_combat_mean, self.food_per_combat_std))
+    def update_food_per_combat(self, rng=np.random):
+        self.food_per_combat = int(rng.normal(self.food_per_combat_mean, self.food_per_combat_std))
     
-    def update_units_per_combat(self):
-        self.units_per_combat = int(np.random.normal(self.units_per_combat_mean, self.units_per_combat_std))
+    def update_units_per_combat(self, rng=np.random):
+        self.units_per_combat = int(rng.normal(self.units_per_combat_mean, self.units_per_combat_std))
     
     def show_status(self):
         status = "Enemy nation\n"
@@ -0,0 +1,103 @@
+import numpy as np
+
+class RunningStats:
+    """
+    Mean and variance of an array of independent streams, updated one
+    observation per stream at a time with Welford's algorithm, so nothing but
+    the accumulators is kept.
+
+    Attributes:
+        count (int): Observations added to every stream.
+        mean (np.ndarray): Mean of every stream.
+
+    Methods:
+        add(values): Add one observation to every stream.
+        variance(): Get the population variance of every stream.
+        std(): Get the population standard deviation of every stream.
+    """
+    def __init__(self, shape):
+        self.count = 0
+        self.mean = np.zeros(shape)
+        self._m2 = np.zeros(shape)
+
+    def add(self, values: np.ndarray):
+        self.count += 1
+        delta = values - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (values - self.mean)
+
+    def variance(self) -> np.ndarray:
+        return self._m2 / self.count if self.count else np.full_like(self._m2, np.nan)
+
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.variance())
+
+class P2Quantile:
+    """
+    Estimates a quantile of an array of independent streams with the P²
+    algorithm (Jain and Chlamtac, 1985): every stream keeps five markers whose
+    heights follow the minimum, the p/2, p and (1+p)/2 quantiles and the
+    maximum, adjusted with a piecewise-parabolic formula as observations
+    arrive. Memory is constant however many observations are added, and every
+    update is a handful of array operations over all the streams.
+
+    Attributes:
+        p (float): The quantile estimated, in [0, 1].
+        count (int): Observations added to every stream.
+
+    Methods:
+        add(values): Add one observation to every stream.
+        value(): Get the estimate of every stream.
+    """
+    def __init__(self, p: float, shape):
+        self.p = p
+        self.count = 0
+        shape = (5,) + (tuple(shape) if isinstance(shape, tuple) else (shape,))
+        column = (5,) + (1,) * (len(shape) - 1)
+        self._heights = np.zeros(shape)
+        self._positions = np.broadcast_to(np.arange(1.0, 6.0).reshape(column), shape).copy()
+        self._desired = np.broadcast_to(np.array([1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]).reshape(column), shape).copy()
+        self._increments = np.array([0, p / 2, p, (1 + p) / 2, 1]).reshape(column)
+
+    def add(self, values: np.ndarray):
+        heights, positions = self._heights, self._positions
+        if self.count < 5:
+            heights[self.count] = values
+            self.count += 1
+            if self.count == 5:
+                heights.sort(axis=0)
+            return
+        self.count += 1
+        heights[0] = np.minimum(heights[0], values)
+        heights[4] = np.maximum(heights[4], values)
+        # Markers above the observation move one position up.
+        for i in range(1, 4):
+            positions[i] += values < heights[i]
+        positions[4] = self.count
+        self._desired += self._increments
+
+        for i in range(1, 4):
+            d = self._desired[i] - positions[i]
+            up = (d >= 1) & (positions[i + 1] - positions[i] > 1)
+            down = (d <= -1) & (positions[i - 1] - positions[i] < -1)
+            move = up | down
+            if not move.any():
+                continue
+            sign = np.where(up, 1.0, -1.0)
+            n_prev, n, n_next = positions[i - 1], positions[i], positions[i + 1]
+            q_prev, q, q_next = heights[i - 1], heights[i], heights[i + 1]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                parabolic = q + sign / (n_next - n_prev) * (
+                    (n - n_prev + sign) * (q_next - q) / (n_next - n)
+                    + (n_next - n - sign) * (q - q_prev) / (n - n_prev)
+                )
+                linear = np.where(up, q + (q_next - q) / (n_next - n), q - (q_prev - q) / (n_prev - n))
+            adjusted = np.where((q_prev < parabolic) & (parabolic < q_next), parabolic, linear)
+            heights[i] = np.where(move, adjusted, q)
+            positions[i] = np.where(move, n + sign, n)
+
+    def value(self) -> np.ndarray:
+        if self.count < 5:
+            # Exact quantile of the few observations seen so far.
+            return np.quantile(self._heights[:self.count], self.p, axis=0)
+        return self._heights[2].copy()
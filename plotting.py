@@ -0,0 +1,274 @@
+import hashlib
+import os
+import numpy as np
+
+FIGURE_SIZE = (10, 6)  # inches
+DPI = 100
+# Bump when the look of the figures changes, so cached figures are rendered again.
+STYLE_VERSION = 1
+# Series up to this length are drawn with a marker per tick.
+MARKER_LIMIT = 200
+# Rows of an array hashed at a time by `_cached_path`.
+HASH_BLOCK = 1 << 16
+
+def decimate(values: np.ndarray, buckets: int) -> tuple:
+    """
+    Downsamples a series for plotting. The ticks are split in `buckets`
+    buckets, about one per horizontal pixel, and each bucket is drawn as its
+    min and max values, so the peaks of the series are kept.
+
+    Args:
+        values (np.ndarray): The value of every tick.
+        buckets (int): Number of buckets.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The times (starting at 1) and values to
+        draw. Series shorter than two points per bucket are returned as they are.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) <= 2 * buckets:
+        return np.arange(1, len(values) + 1), values
+    starts = np.linspace(0, len(values), buckets, endpoint=False).astype(np.int64)
+    time = np.repeat(starts + 1, 2)
+    decimated = np.empty(2 * buckets)
+    decimated[0::2] = np.minimum.reduceat(values, starts)
+    decimated[1::2] = np.maximum.reduceat(values, starts)
+    return time, decimated
+
+def decimate_ranges(time: np.ndarray, minimum: np.ndarray, maximum: np.ndarray, buckets: int) -> tuple:
+    """
+    Like `decimate`, for values already rolled up into ranges: consecutive
+    ranges are merged into at most `buckets` ones, and every range is drawn as
+    its min and max values.
+
+    Args:
+        time (np.ndarray): First tick of every range.
+        minimum (np.ndarray): Min value of every range.
+        maximum (np.ndarray): Max value of every range.
+        buckets (int): Number of buckets.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The times and values to draw.
+    """
+    if len(time) > buckets:
+        starts = np.unique(np.linspace(0, len(time), buckets, endpoint=False).astype(np.int64))
+        time, minimum, maximum = time[starts], np.minimum.reduceat(minimum, starts), np.maximum.reduceat(maximum, starts)
+    decimated = np.empty(2 * len(time))
+    decimated[0::2] = minimum
+    decimated[1::2] = maximum
+    return np.repeat(time, 2), decimated
+
+def _draw_series(figure, attribute_name: str, title: str, time: np.ndarray, values: np.ndarray, marker: bool):
+    axes = figure.add_subplot()
+    axes.plot(time, values, marker='o' if marker else None, linestyle='-', label=attribute_name)
+    axes.set_title(title)
+    axes.set_xlabel("Minutes (Time)")
+    axes.set_ylabel("Value")
+    axes.grid(True)
+    axes.legend()
+
+def _series_page(attribute_name: str, values, buckets: int) -> tuple:
+    # A draw function followed by its arguments, see `_render` and `save_vector_pdf`.
+    if isinstance(values, tuple):
+        time, decimated = decimate_ranges(*values, buckets)
+    else:
+        time, decimated = decimate(values, buckets)
+    return (_draw_series, attribute_name, f"{attribute_name} over Time", time, decimated, len(decimated) <= MARKER_LIMIT)
+
+def _render(path: str, draw, *args):
+    # Figure renders through Agg without pyplot, so no GUI backend is loaded.
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=FIGURE_SIZE)
+    draw(figure, *args)
+    # Written under a temporary name first, so an interrupted render is not cached.
+    figure.savefig(f"{path}.tmp", dpi=DPI, format='png')
+    os.replace(f"{path}.tmp", path)
+    return path
+
+def render_figures(series, cache_dir: str, workers: int = None) -> list:
+    """
+    Renders one PNG figure per series, skipping the figures whose data did not
+    change since they were rendered into `cache_dir`. Series are decimated one
+    at a time, so an iterable that reads them lazily only holds one in memory.
+
+    Args:
+        series (iterable): (attribute name, series) pairs in page order. A series
+            is the values of every tick, or (time, minimum, maximum) ranges as
+            given by `TieredStatsCache.ranges`.
+        cache_dir (str): Directory of the rendered figures.
+        workers (int): Worker processes rendering the figures. Defaults to the
+            CPU count; 1 renders in-process.
+
+    Returns:
+        list[str]: Path of the figure of every series.
+    """
+    buckets = FIGURE_SIZE[0] * DPI
+    paths, tasks = [], []
+    for attribute_name, values in series:
+        if isinstance(values, tuple):
+            path, cached = _cached_path(cache_dir, attribute_name, *values)
+        else:
+            values = np.asarray(values, dtype=np.float64)
+            path, cached = _cached_path(cache_dir, attribute_name, values)
+        paths.append(path)
+        if not cached:
+            tasks.append((_render, path) + _series_page(attribute_name, values, buckets))
+    _run_renders(tasks, workers)
+    return paths
+
+def _cached_path(cache_dir: str, name: str, *arrays) -> tuple:
+    """
+    Returns:
+        tuple[str, bool]: The path of the figure of `name` drawn from `arrays`,
+        and whether it is already rendered. Figures of `name` drawn from other
+        data are removed.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    digest = hashlib.sha1(f"{STYLE_VERSION}".encode())
+    for array in arrays:
+        array = np.atleast_1d(np.asarray(array, dtype=np.float64))
+        # Hashed in blocks, so a memory-mapped column is not copied whole.
+        for start in range(0, len(array), HASH_BLOCK):
+            digest.update(np.ascontiguousarray(array[start:start + HASH_BLOCK]).tobytes())
+    path = os.path.join(cache_dir, f"{name}-{digest.hexdigest()[:16]}.png")
+    if os.path.exists(path):
+        return path, True
+    for file_name in os.listdir(cache_dir):
+        if file_name.rsplit("-", 1)[0] == name:
+            os.remove(os.path.join(cache_dir, file_name))
+    return path, False
+
+def _run_renders(tasks: list, workers: int = None):
+    # Every task is a render function followed by its arguments.
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        for render, *args in tasks:
+            render(*args)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for future in [executor.submit(*task) for task in tasks]:
+                future.result()
+
+def _draw_fan(figure, metric: str, time: np.ndarray, mean: np.ndarray, quantiles: tuple, quantile_values: np.ndarray):
+    axes = figure.add_subplot()
+    # Bands between symmetric quantiles, the inner ones drawn darker.
+    pairs = len(quantiles) // 2
+    for i in range(pairs):
+        axes.fill_between(time, quantile_values[i], quantile_values[-1 - i], color='tab:blue', alpha=0.15 + 0.2 * i / max(1, pairs),
+                          linewidth=0, label=f"P{quantiles[i] * 100:g}-P{quantiles[-1 - i] * 100:g}")
+    if len(quantiles) % 2:
+        axes.plot(time, quantile_values[pairs], color='tab:blue', label=f"P{quantiles[pairs] * 100:g}")
+    axes.plot(time, mean, color='tab:orange', linestyle='--', label="mean")
+    axes.set_title(f"{metric} over Time")
+    axes.set_xlabel("Minutes (Time)")
+    axes.set_ylabel("Value")
+    axes.grid(True)
+    axes.legend()
+
+def render_fan_charts(result, output: str = 'ensemble_plots.pdf', raster: bool = False, cache_dir: str = None, workers: int = None):
+    """
+    Plots the statistics of an ensemble into a PDF, one fan chart per metric:
+    bands between symmetric quantiles (e.g. P5 to P95), the median and the
+    mean over time. Pages are drawn like `render_historics`.
+
+    Args:
+        result (EnsembleResult): The ensemble's statistics.
+        output (str): Path of the PDF.
+        raster (bool): Whether to render the pages as cached PNG figures, see `render_historics`.
+        cache_dir (str): Directory where the figures are cached with `raster`,
+            defaults to `.plot_cache` next to the PDF.
+        workers (int): Worker processes rendering the figures with `raster`, see `render_figures`.
+    """
+    time = result.time if result.time is not None else np.arange(1, result.mean.shape[1] + 1)
+    # Statistics are smooth over time, so long ones are subsampled instead of decimated.
+    kept = np.unique(np.linspace(0, len(time) - 1, min(len(time), FIGURE_SIZE[0] * DPI)).round().astype(np.int64))
+    order = np.argsort(result.quantiles)
+    quantiles = tuple(np.asarray(result.quantiles)[order].tolist())
+    pages = (
+        (_draw_fan, metric, time[kept], result.mean[index, kept], quantiles, result.quantile_values[order][:, index, kept])
+        for index, metric in sorted(enumerate(result.metrics), key=lambda item: item[1])
+    )
+    if not raster:
+        save_vector_pdf(pages, output)
+        return
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(output) or ".", ".plot_cache")
+    paths, tasks = [], []
+    for page in pages:
+        path, cached = _cached_path(cache_dir, f"fan-{page[1]}", *page[2:])
+        paths.append(path)
+        if not cached:
+            tasks.append((_render, path) + page)
+    _run_renders(tasks, workers)
+    save_pdf(paths, output)
+
+def save_vector_pdf(pages, output: str):
+    """
+    Draws the pages into a vector PDF with matplotlib's PdfPages, one page at
+    a time, so a lazy iterable only holds one page's data in memory.
+
+    Args:
+        pages (iterable): A draw function followed by its arguments per page.
+        output (str): Path of the PDF.
+    """
+    from matplotlib.backends.backend_pdf import PdfPages
+    from matplotlib.figure import Figure
+
+    with PdfPages(output) as pdf:
+        for draw, *args in pages:
+            figure = Figure(figsize=FIGURE_SIZE)
+            draw(figure, *args)
+            pdf.savefig(figure)
+
+def save_pdf(paths: list, output: str):
+    """
+    Assembles PNG figures into a PDF, one page per figure. The pages are
+    raster images.
+    """
+    from PIL import Image
+
+    pages = [Image.open(path).convert("RGB") for path in paths]
+    if pages:
+        pages[0].save(output, "PDF", resolution=DPI, save_all=True, append_images=pages[1:])
+
+def render_historics(stats_cache, output: str = 'simulation_plots.pdf', raster: bool = False, cache_dir: str = None, workers: int = None):
+    """
+    Plots every column of a StatsCache over time into a PDF. The historics
+    of a TieredStatsCache are drawn as the range of every bucket.
+
+    Columns are read and decimated one at a time. The rows a StatsCache has
+    streamed to a sink are flushed and read from the memory-mapped file, so
+    plotting does not load the whole run into memory.
+
+    By default the pages are drawn in-process into a vector PDF. With
+    `raster`, they are rendered as PNG figures in worker processes, cached
+    so that the figures of unchanged columns are not rendered again, and
+    assembled into a PDF of images: faster for repeated or long runs, but the
+    pages are no longer vector graphics.
+
+    Args:
+        stats_cache (StatsCache): The recorded historics.
+        output (str): Path of the PDF.
+        raster (bool): Whether to render the pages as cached PNG figures.
+        cache_dir (str): Directory where the figures are rendered and cached
+            with `raster`, defaults to `.plot_cache` next to the PDF.
+        workers (int): Worker processes rendering the figures with `raster`, see `render_figures`.
+    """
+    columns = {name: index for index, name in enumerate(stats_cache.COLUMNS)}
+    if hasattr(stats_cache, "ranges"):
+        time, minimum, maximum, _ = stats_cache.ranges()
+        series = ((name, (time, minimum[columns[name]], maximum[columns[name]])) for name in sorted(columns))
+    else:
+        # With every row in the sink's file, a column is a view of its mapping.
+        stats_cache.flush()
+        series = ((name, getattr(stats_cache, name)) for name in sorted(columns))
+    if not raster:
+        buckets = FIGURE_SIZE[0] * DPI
+        save_vector_pdf((_series_page(name, values, buckets) for name, values in series), output)
+        return
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(output) or ".", ".plot_cache")
+    save_pdf(render_figures(series, cache_dir, workers), output)
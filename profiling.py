@@ -0,0 +1,65 @@
+import json
+
+class EventProfiler:
+    """
+    Per event class statistics of an EventHandler, collected when it is set as
+    the handler's `profiler`. Handlers without a profiler do not pay for it.
+
+    Attributes:
+        events (dict[str, list]): Per event class name, the [calls, cumulative
+            seconds, max seconds] of its `tick()` runs.
+        created (dict[str, int]): Events added to the handler per class name.
+        finished (dict[str, int]): Events that finished per class name.
+        queue_ticks (list[int]): Ticks when the queue length was recorded.
+        queue_lengths (list[int]): Pending events after each of `queue_ticks`.
+
+    Methods:
+        to_dict(): Get the statistics as plain values.
+        save(path): Write the statistics to a JSON file.
+    """
+    def __init__(self):
+        self.events = {}
+        self.created = {}
+        self.finished = {}
+        self.queue_ticks = []
+        self.queue_lengths = []
+
+    def record_created(self, event):
+        name = type(event).__name__
+        self.created[name] = self.created.get(name, 0) + 1
+
+    def record_finished(self, event):
+        name = type(event).__name__
+        self.finished[name] = self.finished.get(name, 0) + 1
+
+    def record_tick(self, event, seconds: float):
+        stats = self.events.get(type(event).__name__)
+        if stats is None:
+            stats = self.events[type(event).__name__] = [0, 0.0, 0.0]
+        stats[0] += 1
+        stats[1] += seconds
+        if seconds > stats[2]:
+            stats[2] = seconds
+
+    def record_queue(self, tick: int, length: int):
+        self.queue_ticks.append(tick)
+        self.queue_lengths.append(length)
+
+    def to_dict(self) -> dict:
+        names = sorted(set(self.events) | set(self.created) | set(self.finished))
+        events = {}
+        for name in names:
+            calls, seconds, max_seconds = self.events.get(name, (0, 0.0, 0.0))
+            events[name] = {
+                "calls": calls,
+                "seconds": seconds,
+                "max_seconds": max_seconds,
+                "mean_seconds": seconds / calls if calls else 0.0,
+                "created": self.created.get(name, 0),
+                "finished": self.finished.get(name, 0),
+            }
+        return {"events": events, "queue": {"ticks": self.queue_ticks, "lengths": self.queue_lengths}}
+
+    def save(self, path: str):
+        with open(path, 'w') as file:
+            json.dump(self.to_dict(), file)
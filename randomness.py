@@ -0,0 +1,96 @@
+import numpy as np
+
+# Every subsystem draws from its own stream, so adding draws to one of them
+# does not shift the random numbers seen by the others.
+SUBSYSTEMS = ("mines", "animals", "enemy", "attacks", "combat", "costs")
+
+class BlockSampler:
+    """
+    Wraps a NumPy Generator and pre-draws uniforms and standard normals in
+    blocks, so scalar draws do not pay a generator call each.
+
+    The draws are a deterministic function of the generator's seed, so replays
+    with the same seed are bit-identical.
+
+    Attributes:
+        generator (np.random.Generator): The generator the blocks are drawn from.
+        block_size (int): Number of values drawn at once.
+
+    Methods:
+        random(): Draw a uniform in [0, 1).
+        normal(mean, std): Draw a normal value.
+        integers(low, high): Draw an integer in [low, high).
+        choice(values, size): Draw from a sequence.
+        geometric(p, size): Draw geometric waiting times.
+    """
+    def __init__(self, generator: np.random.Generator, block_size: int = 1024):
+        self.generator = generator
+        self.block_size = block_size
+        self._uniforms = []
+        self._next_uniform = 0
+        self._normals = []
+        self._next_normal = 0
+
+    def random(self) -> float:
+        if self._next_uniform == len(self._uniforms):
+            self._uniforms = self.generator.random(self.block_size).tolist()
+            self._next_uniform = 0
+        value = self._uniforms[self._next_uniform]
+        self._next_uniform += 1
+        return value
+
+    def normal(self, mean: float, std: float) -> float:
+        if self._next_normal == len(self._normals):
+            self._normals = self.generator.standard_normal(self.block_size).tolist()
+            self._next_normal = 0
+        value = self._normals[self._next_normal]
+        self._next_normal += 1
+        return mean + std * value
+
+    def integers(self, low: int, high: int) -> int:
+        return int(self.generator.integers(low, high))
+
+    def choice(self, values, size: int = None):
+        if size is None:
+            return values[int(self.random() * len(values))]
+        return self.generator.choice(values, size)
+
+    def geometric(self, p: float, size: int = None):
+        return self.generator.geometric(p, size)
+
+class RandomStreams:
+    """
+    Seedable source of the random streams of a simulation. Each subsystem of
+    `SUBSYSTEMS` gets a BlockSampler over a generator derived from the root
+    seed with `SeedSequence.spawn`, which keeps the streams independent from
+    each other and from the streams of other replicas.
+
+    Attributes:
+        seed_sequence (np.random.SeedSequence): The root seed.
+        block_size (int): Block size of the samplers.
+
+    Methods:
+        stream(name): Get the sampler of a subsystem.
+        cost_seed(): Get the integer seed used for the building costs.
+        spawn(n): Derive independent RandomStreams, e.g. for parallel replicas.
+    """
+    def __init__(self, seed=None, block_size: int = 1024):
+        if isinstance(seed, np.random.SeedSequence):
+            self.seed_sequence = seed
+        else:
+            self.seed_sequence = np.random.SeedSequence(seed)
+        self.block_size = block_size
+        self._children = dict(zip(SUBSYSTEMS, self.seed_sequence.spawn(len(SUBSYSTEMS))))
+        self._streams = {
+            name: BlockSampler(np.random.default_rng(child), block_size)
+            for name, child in self._children.items()
+        }
+
+    def stream(self, name: str) -> BlockSampler:
+        return self._streams[name]
+
+    def cost_seed(self) -> int:
+        return int.from_bytes(self._children["costs"].generate_state(4).tobytes(), 'little')
+
+    def spawn(self, n: int) -> list:
+        return [RandomStreams(child, self.block_size) for child in self.seed_sequence.spawn(n)]
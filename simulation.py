@@ -1,21 +1,90 @@
+from battles import BattleRecorder
 from historics import StatsCache
 from handlers import EventHandler
+from entities import animal_types
+from randomness import RandomStreams, SUBSYSTEMS
+from snapshot import save_snapshot, load_snapshot
 from utils import EventAdditionError
+import copy
 import events
 import numpy as np
-import random
+
+def sample_spawn_ticks(rng, probability: float, start: int, end: int) -> np.ndarray:
+    """
+    Samples the ticks in (start, end] where a spawner that fires with the given
+    probability on every tick fires, drawing the geometric waiting times
+    between spawns instead of one Bernoulli trial per tick.
+    """
+    if probability <= 0 or end <= start:
+        return np.empty(0, dtype=np.int64)
+    if probability >= 1:
+        return np.arange(start + 1, end + 1)
+    batch = int((end - start) * probability * 1.1) + 16
+    ticks = []
+    last = start
+    while last < end:
+        spawns = last + np.cumsum(rng.geometric(probability, size=batch))
+        ticks.append(spawns)
+        last = spawns[-1]
+    ticks = np.concatenate(ticks)
+    return ticks[ticks <= end]
 
 class Simulation:
-    def __init__(self, nation, resources, combat, research_and_dev, enemy_nation):
+    def __init__(self, nation, resources, combat, research_and_dev, enemy_nation, stats_cache: StatsCache = None, seed=None, profiler=None):
         self.nation = nation
         self.resources = resources
         self.combat = combat
         self.research_and_dev = research_and_dev
         self.enemy_nation = enemy_nation
         self.not_worked_space_for_new_era = self.nation.not_worked_space * 2
-        self.stats_cache = StatsCache()
-        self.seed = random.getrandbits(100)
+        for building in self.resources.gold_food_buildings + self.combat.attack_buildings + self.combat.defense_buildings:
+            self.nation.buildings.add(building)
+        self.stats_cache = stats_cache if stats_cache is not None else StatsCache()
+        self.battles = BattleRecorder()
+        self.rng = RandomStreams(seed)
+        self.seed = self.rng.cost_seed()
+        self.event_handler = EventHandler(self.nation, [], profiler)
+        self.add_default_events(self.event_handler)
     
+    def snapshot(self, path: str):
+        """
+        Saves the whole state of the simulation to `path`, see `snapshot.save_snapshot`.
+        """
+        save_snapshot(self, path)
+
+    @classmethod
+    def restore(cls, path: str) -> "Simulation":
+        """
+        Loads a simulation saved with `snapshot`, see `snapshot.load_snapshot`.
+        """
+        return load_snapshot(path)
+
+    def fork(self, n: int) -> list:
+        """
+        Creates `n` independent continuations of the simulation, e.g. to try
+        different decisions from the current state.
+
+        The historics recorded so far are shared with the branches instead of
+        copied (see `StatsCache.fork`). The rest of the state is small and
+        changes on every tick, so each branch gets its own deep copy of it.
+        Each branch gets independent random streams spawned from this
+        simulation's ones, but keeps the same building costs.
+
+        Args:
+            n (int): Number of branches.
+
+        Returns:
+            list[Simulation]: The branches, which can be run on their own.
+        """
+        branches = []
+        for stats_cache, rng in zip(self.stats_cache.fork(n), self.rng.spawn(n)):
+            # Objects in the memo are used as they are instead of being copied.
+            memo = {id(self.stats_cache): stats_cache, id(self.rng): rng}
+            for name in SUBSYSTEMS:
+                memo[id(self.rng.stream(name))] = rng.stream(name)
+            branches.append(copy.deepcopy(self, memo))
+        return branches
+
     def run(self):
         # Your simulation logic here
         print("Running simulation with the following data:")
@@ -24,8 +93,7 @@ class Simulation:
         print("Combat:", self.combat)
         print("Research and Development:", self.research_and_dev)
         print("Enemy Nation:", self.enemy_nation)
-        event_handler = EventHandler(self.nation)
-        self.add_default_events(event_handler)
+        event_handler = self.event_handler
         while True:
             print(self.nation.show_status())
             print("1. Add a new event")
@@ -53,20 +121,15 @@ class Simulation:
                 input()
             elif choice == "3":
                 # Advance the simulation by one time step
-                self.roll_for_enemy_attack(event_handler)
-                event_handler.advance_time()
-                self.stats_cache.update_historics(self)  # Update historical data
+                self.step()
                 print("Simulation advanced by one time step.")
                 input()
             elif choice == "4":
-                if self.nation.not_worked_space > 0:
-                    print("You have to used all available space first.")
-                else:
-                    self.research_and_dev.era_level += 1
-                    self.nation.not_worked_space = self.not_worked_space_for_new_era
-                    self.not_worked_space_for_new_era *= 2
-                    self.research_and_dev.max_building_improvements += 5
+                try:
+                    self.advance_era()
                     print("Nation era advanced")
+                except EventAdditionError as e:
+                    print(e)
             elif choice == "5":
                 self.show_event_list()
             elif choice == "6":
@@ -78,20 +141,163 @@ class Simulation:
                 input()
         print("Saving graphs to 'simulation_plots.pdf' file")
         self.stats_cache.plot_all_attributes()
+
+    def run_batch(self, ticks: int, actions: dict = None, fast_forward: bool = False) -> list:
+        """
+        Runs the simulation without user interaction for a number of ticks.
+
+        Args:
+            ticks (int): Number of time steps to advance.
+            actions (dict): Schedule mapping a tick of the nation's clock to the
+                actions issued right before that tick is advanced. An action is
+                either an event name ("MineGold") or an (event name, argument)
+                pair (("HuntAnimal", "Deer")). "AdvanceEra" is also accepted.
+            fast_forward (bool): Whether to use `fast_forward` between the ticks
+                that have actions scheduled.
+
+        Returns:
+            list: The actions that could not be added, as (tick, action, reason) tuples.
+        """
+        actions = actions or {}
+        rejected = []
+        end = self.nation.current_time + ticks
+        action_ticks = sorted(tick for tick in actions if tick > self.nation.current_time)
+        next_action = 0
+        while self.nation.current_time < end:
+            now = self.nation.current_time
+            for action in actions.get(now, ()):
+                try:
+                    name, argument = self._parse_action(action)
+                    if name == "AdvanceEra":
+                        self.advance_era()
+                    else:
+                        self.create_events_based_on_input(name, self.event_handler, argument, interactive=False)
+                except EventAdditionError as e:
+                    rejected.append((now, action, str(e)))
+            if fast_forward:
+                while next_action < len(action_ticks) and action_ticks[next_action] <= now:
+                    next_action += 1
+                until = action_ticks[next_action] if next_action < len(action_ticks) else end
+                self.fast_forward(min(until, end))
+            else:
+                self.step()
+        return rejected
+
+    @staticmethod
+    def _parse_action(action) -> tuple:
+        if isinstance(action, str):
+            return action, None
+        if isinstance(action, (tuple, list)) and len(action) == 2 and isinstance(action[0], str):
+            return action[0], action[1]
+        raise EventAdditionError(f"Invalid action {action!r}, expected an event name or an (event name, argument) pair.")
+
+    def step(self):
+        """
+        Advances the simulation by one time step and records its historics.
+        """
+        self.roll_for_enemy_attack(self.event_handler)
+        self.event_handler.advance_time()
+        self.stats_cache.update_historics(self)
+
+    def fast_forward(self, until_tick: int):
+        """
+        Advances the simulation up to `until_tick` without player decisions,
+        jumping over the stretches where only the spawners and the enemy run.
+
+        Ticks where a pending event finishes are run normally. In between, the
+        gold mine and animal spawns and the next enemy attack are sampled from
+        their geometric waiting times, and the StatsCache is filled with one
+        run-length row per stretch where nothing changed. The enemy's per
+        combat values are only drawn again on the ticks that are run normally.
+        Stretches are only skipped while the attack risk rate is stationary.
+
+        Args:
+            until_tick (int): Tick of the nation's clock to stop at.
+        """
+        handler = self.event_handler
+        while self.nation.current_time < until_tick:
+            now = self.nation.current_time
+            busy_tick = handler.next_busy_tick()
+            stop = until_tick if busy_tick is None else min(until_tick, busy_tick - 1)
+            if stop <= now or handler.attack_running or not self._attacks_risk_rate_is_stationary():
+                self.step()
+                continue
+
+            attack_tick = now + int(self.rng.stream("attacks").geometric(self.enemy_nation.attacks_risk_rate))
+            end = min(stop, attack_tick - 1)
+            self._skip_idle_ticks(now, end)
+            if attack_tick <= stop:
+                self.start_enemy_attack(handler)
+                handler.advance_time()
+                self.stats_cache.update_historics(self)
+
+    def _attacks_risk_rate_is_stationary(self) -> bool:
+        rate = self.enemy_nation.attacks_risk_rate
+        return 0 < rate == self.enemy_nation.next_attacks_risk_rate(self.resources)
+
+    def _skip_idle_ticks(self, now: int, end: int):
+        animals_rng = self.rng.stream("animals")
+        mine_ticks = sample_spawn_ticks(self.rng.stream("mines"), 1 - self.nation.gold_mine_spawn_rate, now, end)
+        animal_ticks = sample_spawn_ticks(animals_rng, 1 - self.nation.animal_spawn_rate, now, end)
+        animal_names = animals_rng.choice(animal_types, len(animal_ticks))
+        change_ticks = np.union1d(mine_ticks, animal_ticks)
+        mines_until = np.searchsorted(mine_ticks, change_ticks, side='right')
+        animals_until = np.searchsorted(animal_ticks, change_ticks, side='right')
+
+        recorded, mines, animals = now, 0, 0
+        for tick, mines_until_tick, animals_until_tick in zip(change_ticks.tolist(), mines_until.tolist(), animals_until.tolist()):
+            if tick - 1 > recorded:
+                self.stats_cache.update_historics(self, repeat=tick - 1 - recorded)
+            self.nation.gold_mines += mines_until_tick - mines
+            for animal_name in animal_names[animals:animals_until_tick]:
+                self.nation.animals.add(animal_name, tick)
+            self.stats_cache.update_historics(self)
+            recorded, mines, animals = tick, mines_until_tick, animals_until_tick
+        if end > recorded:
+            self.stats_cache.update_historics(self, repeat=end - recorded)
+        self.event_handler.skip_to(end)
+
+    def advance_era(self):
+        """
+        Moves the nation to the next era once all the available space is used.
+
+        Raises:
+            EventAdditionError: If there is still space that has not been worked.
+        """
+        if self.nation.not_worked_space > 0:
+            raise EventAdditionError("You have to used all available space first.")
+        self.research_and_dev.era_level += 1
+        self.nation.not_worked_space = self.not_worked_space_for_new_era
+        self.not_worked_space_for_new_era *= 2
+        self.research_and_dev.max_building_improvements += 5
     
     def add_default_events(self, event_handler: EventHandler):
-        event_handler.add_event(events.SpawnMineEvent(self.nation))
-        event_handler.add_event(events.SpawnAnimalEvent(self.nation))
-        event_handler.add_event(events.UpdateRandomValuesEvent(self.enemy_nation, self.resources))
+        event_handler.add_event(events.SpawnMineEvent(self.nation, self.rng.stream("mines")))
+        event_handler.add_event(events.SpawnAnimalEvent(self.nation, self.rng.stream("animals")))
+        event_handler.add_event(events.UpdateRandomValuesEvent(self.enemy_nation, self.resources, self.rng.stream("enemy")))
 
     def roll_for_enemy_attack(self, event_handler: EventHandler):
         if event_handler.attack_running:
             return
-        random_prob = np.random.rand()
+        random_prob = self.rng.stream("attacks").random()
         if random_prob < self.enemy_nation.attacks_risk_rate:
-            event_handler.add_event(events.DefendFromEnemiesEvent(self.enemy_nation, self.combat, self.resources))
+            self.start_enemy_attack(event_handler)
+
+    def start_enemy_attack(self, event_handler: EventHandler):
+        event_handler.add_event(events.DefendFromEnemiesEvent(self.enemy_nation, self.combat, self.resources, self.rng.stream("combat"), self.battles, self.nation))
     
-    def create_events_based_on_input(self, user_input, event_handler):
+    def create_events_based_on_input(self, user_input, event_handler, argument=None, interactive=True):
+        """
+        Adds the event of a player action.
+
+        Args:
+            user_input (str): Name of the action, e.g. "MineGold".
+            event_handler (EventHandler): Handler the event is added to.
+            argument: Animal name, building type or building to improve of the
+                actions that need one.
+            interactive (bool): Whether a missing argument is asked for with
+                input(). Otherwise it raises EventAdditionError.
+        """
         if user_input == "MineGold":
             self.nation.mine_gold(event_handler, self.resources)
         elif user_input == "CollectRoadGold":
@@ -101,21 +307,29 @@ class Simulation:
         elif user_input == "OpenSpace":
             self.nation.open_space(event_handler)
         elif user_input == "HuntAnimal":
-            animal_name = input("Enter the animal name: ")
+            animal_name = self._action_argument(user_input, argument, interactive, "Enter the animal name: ")
             self.nation.hunt_animal(event_handler, animal_name, self.resources)
         elif user_input == "BuildBuilding":
-            building_type = input("Enter the building type: ")
+            building_type = self._action_argument(user_input, argument, interactive, "Enter the building type: ")
             self.research_and_dev.create_building(event_handler, self.nation, self.resources, self.combat, building_type, self.seed)
         elif user_input == "ImproveBuilding":
-            building_name = input("Enter the building to improve: ")
+            building_name = self._action_argument(user_input, argument, interactive, "Enter the building to improve: ")
             self.research_and_dev.improve_building(event_handler, self.nation, self.resources, self.combat, building_name, self.seed)
         elif user_input == "AttackEnemies":
             self.enemy_nation.update_attacks_risk_rate(self.resources)
-            event = events.AttackEnemiesEvent(self.enemy_nation, self.combat, self.resources)
+            event = events.AttackEnemiesEvent(self.enemy_nation, self.combat, self.resources, self.rng.stream("combat"), self.battles, self.nation)
             event_handler.add_event(event)
         else:
             raise EventAdditionError("Invalid event name. Please try again.")
     
+    @staticmethod
+    def _action_argument(user_input, argument, interactive, prompt):
+        if argument is not None:
+            return argument
+        if not interactive:
+            raise EventAdditionError(f"{user_input} needs an argument.")
+        return input(prompt)
+
     def show_event_list(self):
         events = {
             "MineGold": "Mine gold from available gold mines.",
@@ -0,0 +1,78 @@
+import json
+import mmap
+import pickle
+from eventlog import event_log
+
+MAGIC = b"DOMSNAP1"
+ALIGNMENT = 64
+
+def _aligned(size: int) -> int:
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+def save_snapshot(simulation, path: str):
+    """
+    Writes the whole state of a simulation to a binary file: the models, the
+    pending events with their remaining ticks, the recorded historics and the
+    state of the random streams.
+
+    The state is pickled with protocol 5, and the large NumPy arrays (the
+    historics) are written out of band as raw buffers aligned to 64 bytes
+    after the pickle, so `load_snapshot` can map them instead of copying them.
+    The file starts with the magic, the header length and a JSON header with
+    the offset and size of every section.
+
+    Args:
+        simulation (Simulation): The simulation to save.
+        path (str): Path of the file.
+
+    Raises:
+        ValueError: If the historics are streamed to a sink, since part of them
+            would only live in the sink's file.
+    """
+    if simulation.stats_cache.sink is not None:
+        raise ValueError("Simulations streaming their historics to a file cannot be snapshotted")
+    buffers = []
+    payload = pickle.dumps(simulation, protocol=5, buffer_callback=buffers.append)
+    sections = [memoryview(payload)] + [buffer.raw() for buffer in buffers]
+    layout = []
+    offset = 0
+    for section in sections:
+        layout.append([offset, section.nbytes])
+        offset = _aligned(offset + section.nbytes)
+    header = json.dumps({"pickle": layout[0], "buffers": layout[1:]}).encode()
+    prefix_size = len(MAGIC) + 4
+    header = header.ljust(_aligned(prefix_size + len(header)) - prefix_size)
+    with open(path, 'wb') as file:
+        file.write(MAGIC)
+        file.write(len(header).to_bytes(4, 'little'))
+        file.write(header)
+        for (start, _), section in zip(layout, sections):
+            file.write(b"\0" * (prefix_size + len(header) + start - file.tell()))
+            file.write(section)
+
+def load_snapshot(path: str):
+    """
+    Reads a simulation saved by `save_snapshot`.
+
+    The file is mapped copy-on-write and the historics arrays are views of the
+    mapping, so restoring does not read or copy them, and writing to them does
+    not change the file.
+
+    Args:
+        path (str): Path of the file.
+
+    Returns:
+        Simulation: The restored simulation, ready to continue.
+    """
+    with open(path, 'rb') as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a snapshot file")
+        header_size = int.from_bytes(file.read(4), 'little')
+        header = json.loads(file.read(header_size))
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+    start = len(MAGIC) + 4 + header_size
+    view = memoryview(mapping)
+    sections = [view[start + offset:start + offset + size] for offset, size in [header["pickle"], *header["buffers"]]]
+    simulation = pickle.loads(sections[0], buffers=sections[1:])
+    event_log.tick = simulation.nation.current_time
+    return simulation
@@ -0,0 +1,96 @@
+import json
+import os
+import numpy as np
+
+MAGIC = b"DOMHIST1"
+HEADER_ALIGNMENT = 64
+DTYPE = np.dtype("<f8")
+
+class HistoricsWriter:
+    """
+    Append-only sink that streams per-tick historics to a binary file.
+
+    The file starts with a small header (magic, header length and a JSON
+    description of the columns) padded to a 64 bytes boundary, followed by
+    float64 rows, one per tick, appended in chunks. A StatsCache created with
+    a writer as its sink only keeps the chunk it is filling in memory.
+
+    Attributes:
+        path (str): Path of the file.
+        columns (tuple[str]): Names of the columns of every row.
+        chunk_size (int): Rows kept in memory before they are written.
+        rows (int): Rows written so far.
+
+    Methods:
+        write(rows): Append rows to the file.
+        flush(): Flush the written rows to the operating system.
+        close(): Close the file.
+    """
+    DEFAULT_CHUNK_SIZE = 65536
+
+    def __init__(self, path: str, columns: tuple, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.path = path
+        self.columns = tuple(columns)
+        self.chunk_size = chunk_size
+        self.rows = 0
+        header = json.dumps({"columns": list(self.columns), "dtype": DTYPE.str}).encode()
+        prefix_size = len(MAGIC) + 4
+        padded_size = -(-(prefix_size + len(header)) // HEADER_ALIGNMENT) * HEADER_ALIGNMENT
+        header = header.ljust(padded_size - prefix_size)
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC)
+        self._file.write(len(header).to_bytes(4, 'little'))
+        self._file.write(header)
+
+    def write(self, rows: np.ndarray):
+        """
+        Args:
+            rows (np.ndarray): C-contiguous float64 array of shape (ticks, len(columns)).
+        """
+        self._file.write(memoryview(np.ascontiguousarray(rows, dtype=DTYPE)))
+        self.rows += len(rows)
+        self._file.flush()
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+class HistoricsReader:
+    """
+    Memory-mapped view of a file written by HistoricsWriter. Nothing is loaded
+    until it is accessed.
+
+    Attributes:
+        columns (tuple[str]): Names of the columns.
+        data (np.memmap): The rows of the file, shape (ticks, len(columns)).
+    """
+    def __init__(self, path: str):
+        with open(path, 'rb') as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a historics file")
+            header_size = int.from_bytes(file.read(4), 'little')
+            header = json.loads(file.read(header_size))
+        self.columns = tuple(header["columns"])
+        dtype = np.dtype(header["dtype"])
+        offset = len(MAGIC) + 4 + header_size
+        # A run that was interrupted while writing may leave a partial last row.
+        rows = (os.path.getsize(path) - offset) // (dtype.itemsize * len(self.columns))
+        if rows == 0:
+            self.data = np.empty((0, len(self.columns)), dtype=dtype)
+        else:
+            self.data = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(rows, len(self.columns)))
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.data[:, self.columns.index(column)]
+
+def open_historics(path: str) -> HistoricsReader:
+    """
+    Opens a historics file memory-mapped for analysis.
+    """
+    return HistoricsReader(path)
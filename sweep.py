@@ -0,0 +1,146 @@
+import hashlib
+import itertools
+import json
+import os
+import numpy as np
+from config import field_type, load_config
+from ensemble import EnsembleResult, run_ensemble
+
+def grid(spec: dict) -> list:
+    """
+    Expands a grid over dotted fields into configs.
+
+    Args:
+        spec (dict): Values to try per field, e.g. {"nation.animal_spawn_rate": [0.3, 0.5]}.
+
+    Returns:
+        list[dict]: One config (dotted field to value) per combination of values.
+    """
+    fields = list(spec)
+    return [dict(zip(fields, values)) for values in itertools.product(*(spec[field] for field in fields))]
+
+def latin_hypercube(spec: dict, samples: int, seed=None) -> list:
+    """
+    Samples configs with a Latin hypercube: the range of every field is split
+    in `samples` strata and every stratum is used by exactly one config.
+    Samples of int fields are rounded to the nearest integer.
+
+    Args:
+        spec (dict): (low, high) range per dotted field.
+        samples (int): Number of configs.
+        seed (int): Seed of the sampling.
+
+    Returns:
+        list[dict]: The configs, mapping each dotted field to a value.
+    """
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for field, (low, high) in spec.items():
+        strata = (rng.permutation(samples) + rng.random(samples)) / samples
+        values = low + strata * (high - low)
+        if field_type(field) is int:
+            values = np.round(values).astype(np.int64)
+        columns[field] = values.tolist()
+    return [{field: values[i] for field, values in columns.items()} for i in range(samples)]
+
+def config_hash(overrides: dict, settings: dict) -> str:
+    """
+    Returns:
+        str: A key identifying the results of a config run with the given
+        settings, the same for configs that only differ in the field order.
+    """
+    key = json.dumps({"overrides": overrides, "settings": settings}, sort_keys=True, default=str)
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+def run_sweep(configs: list, ticks: int, replicas: int, output_dir: str = 'sweep', models_path: str = 'models.yml',
+              actions: dict = None, seed: int = 0, workers: int = None, engine: str = "object") -> dict:
+    """
+    Runs an ensemble of every config and collects them in a columnar table.
+
+    Configs that are equal are only run once. The result of every config is
+    saved in `output_dir` under its `config_hash` as soon as it finishes, and
+    configs that already have a result there are not run again, so an
+    interrupted sweep resumes where it stopped. Every config uses the same
+    root seed, so they are compared on the same random numbers.
+
+    Args:
+        configs (list[dict]): Dotted field overrides of every config, see `grid` and `latin_hypercube`.
+        ticks (int): Ticks of every run.
+        replicas (int): Runs per config.
+        output_dir (str): Directory of the results.
+        models_path (str): YAML file with the models' data the configs are applied to.
+        actions (dict): Action schedule shared by all the runs.
+        seed (int): Root seed of every ensemble.
+        workers (int): Worker processes of every ensemble.
+        engine (str): Engine of every ensemble, see `ensemble.run_ensemble`.
+
+    Returns:
+        dict[str, np.ndarray]: The table, saved as well to `output_dir/results.npz`.
+        It has one row per distinct config and the columns "config", one per
+        swept field, and the mean and std of every metric at the last tick.
+    """
+    config = load_config(models_path)
+    # Invalid configs fail here, before any of them is run.
+    for overrides in configs:
+        config.with_overrides(overrides)
+    os.makedirs(output_dir, exist_ok=True)
+    settings = {
+        "models": config.digest, "ticks": ticks, "replicas": replicas,
+        "actions": actions or {}, "seed": seed, "engine": engine,
+    }
+    unique = {}
+    for overrides in configs:
+        unique.setdefault(config_hash(overrides, settings), overrides)
+
+    results = {}
+    for key, overrides in unique.items():
+        path = os.path.join(output_dir, f"{key}.npz")
+        if os.path.exists(path):
+            results[key] = EnsembleResult.load(path)
+            continue
+        print(f"Running config {key}: {overrides}")
+        result = run_ensemble(replicas, ticks, actions, models_path=models_path, seed=seed,
+                              workers=workers, engine=engine, overrides=overrides)
+        # Written under a temporary name first, so an interrupted write is not taken as a result.
+        with open(f"{path}.tmp", 'wb') as file:
+            result.save(file)
+        os.replace(f"{path}.tmp", path)
+        results[key] = result
+
+    fields = sorted({field for overrides in unique.values() for field in overrides})
+    table = {"config": np.array(list(unique))}
+    for field in fields:
+        table[field] = np.array([overrides.get(field, np.nan) for overrides in unique.values()])
+    metrics = next(iter(results.values())).metrics if results else ()
+    for index, name in enumerate(metrics):
+        table[f"{name}.mean"] = np.array([results[key].mean[index, -1] for key in unique])
+        table[f"{name}.std"] = np.array([results[key].std[index, -1] for key in unique])
+    np.savez(os.path.join(output_dir, "results.npz"), **table)
+    return table
+
+def load_sweep_spec(path: str) -> list:
+    """
+    Reads the configs of a sweep from a YAML file with either a grid:
+
+        grid:
+          nation.animal_spawn_rate: [0.3, 0.5, 0.7]
+
+    or a Latin hypercube:
+
+        latin_hypercube:
+          enemy_nation.attack_coefficient: [0.4, 0.8]
+        samples: 20
+        seed: 1
+
+    Returns:
+        list[dict]: The configs.
+    """
+    import yaml
+
+    with open(path, 'r') as file:
+        spec = yaml.safe_load(file) or {}
+    if "grid" in spec:
+        return grid(spec["grid"])
+    if "latin_hypercube" in spec:
+        return latin_hypercube(spec["latin_hypercube"], spec["samples"], spec.get("seed"))
+    raise ValueError(f"{path} needs a 'grid' or a 'latin_hypercube' section")
@@ -0,0 +1,45 @@
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import load_config
+from eventlog import event_log
+from simulation import Simulation
+
+MODELS_PATH = os.path.join(ROOT, "models.yml")
+
+@pytest.fixture(autouse=True)
+def quiet_event_log():
+    with event_log.silenced():
+        yield
+
+def build_simulation(seed=None, stats_cache=None, attack_force_rate=None) -> Simulation:
+    """ A simulation of the repository's models.yml. """
+    nation, resources, combat, research_and_dev, enemy_nation = load_config(MODELS_PATH).build()
+    if attack_force_rate is not None:
+        combat.attack_force_rate = attack_force_rate
+    return Simulation(nation, resources, combat, research_and_dev, enemy_nation, stats_cache=stats_cache, seed=seed)
+
+def scripted_actions(ticks: int, start: int = 0) -> dict:
+    """ A schedule that exercises the player actions, the combat and the buildings. """
+    actions = {}
+    for tick in range(start + 1, start + ticks + 1):
+        due = []
+        if tick % 7 == 0:
+            due.append("MineGold")
+        if tick % 13 == 0:
+            due.append("CollectRoadGold")
+        if tick % 29 == 0:
+            due.append(("HuntAnimal", "Deer"))
+        if tick % 50 == 0:
+            due.append("BuildRoad")
+        if tick % 61 == 0:
+            due.append(("BuildBuilding", "Gold"))
+        if tick % 97 == 0:
+            due.append("AttackEnemies")
+        if due:
+            actions[tick] = due
+    return actions
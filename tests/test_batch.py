@@ -0,0 +1,23 @@
+import pytest
+from conftest import build_simulation
+from main import load_actions_from_yml
+from utils import ConfigError
+
+def test_batch_rejects_actions_without_prompting(monkeypatch):
+    def prompt(*args):
+        raise AssertionError("batch runs must not prompt")
+    monkeypatch.setattr("builtins.input", prompt)
+    simulation = build_simulation(seed=0)
+    now = simulation.nation.current_time
+    malformed = ["HuntAnimal", "BuildBuilding", "ImproveBuilding", ("BuildBuilding",), ("HuntAnimal", "Deer", 1), 5]
+    rejected = simulation.run_batch(3, {now: malformed})
+    assert [action for _, action, _ in rejected] == malformed
+    assert rejected[0][2] == "HuntAnimal needs an argument."
+
+def test_actions_file_accepts_single_actions(tmp_path):
+    path = tmp_path / "actions.yml"
+    path.write_text("5: MineGold\n6: [MineGold, [HuntAnimal, Deer]]\n7:\n")
+    assert load_actions_from_yml(str(path)) == {5: ["MineGold"], 6: ["MineGold", ("HuntAnimal", "Deer")], 7: []}
+    path.write_text("5: 3\n")
+    with pytest.raises(ConfigError):
+        load_actions_from_yml(str(path))
@@ -0,0 +1,40 @@
+import numpy as np
+from conftest import build_simulation
+from historics import StatsCache
+
+REPLICAS = 60
+TICKS = 2000
+COMPARED_TICKS = (0, 99, 499, 1999)
+
+def sparse_actions(start: int) -> dict:
+    """ A few actions, far enough apart to leave stretches to skip. """
+    actions = {}
+    for tick in range(start + 50, start + TICKS, 50):
+        actions[tick] = ["BuildRoad", "MineGold"] if tick % 200 else ["BuildRoad", "AttackEnemies"]
+    return actions
+
+def run_replicas(fast_forward: bool, scheduled: bool) -> np.ndarray:
+    historics = []
+    for seed in range(REPLICAS):
+        simulation = build_simulation(seed=seed)
+        start = simulation.nation.current_time
+        simulation.run_batch(TICKS, sparse_actions(start) if scheduled else None, fast_forward=fast_forward)
+        assert simulation.nation.current_time == start + TICKS
+        assert len(simulation.stats_cache) == TICKS
+        historics.append(simulation.stats_cache.to_array()[:, COMPARED_TICKS])
+    return np.stack(historics)
+
+def assert_same_distribution(stepwise: np.ndarray, skipped: np.ndarray):
+    # The runs are seeded, so this is deterministic; the bound leaves room for
+    # the sampling noise of the replicas, not for a biased fast-forward.
+    difference = stepwise.mean(axis=0) - skipped.mean(axis=0)
+    standard_error = np.sqrt((stepwise.var(axis=0, ddof=1) + skipped.var(axis=0, ddof=1)) / REPLICAS)
+    bound = 5 * standard_error + 1e-9 * (1 + np.abs(stepwise.mean(axis=0)))
+    for metric, metric_difference, metric_bound in zip(StatsCache.COLUMNS, difference, bound):
+        assert np.all(np.abs(metric_difference) <= metric_bound), metric
+
+def test_fast_forward_matches_stepwise_idle_runs():
+    assert_same_distribution(run_replicas(False, False), run_replicas(True, False))
+
+def test_fast_forward_matches_stepwise_runs_with_actions():
+    assert_same_distribution(run_replicas(False, True), run_replicas(True, True))
@@ -0,0 +1,102 @@
+import numpy as np
+from conftest import build_simulation, scripted_actions
+from eventlog import event_log
+from events import Event, RestFromAttackEvent
+from handlers import EventHandler
+
+class PollingEventHandler(EventHandler):
+    """
+    Reference handler that ticks every pending event on every tick, in
+    insertion order, as the handler did before the priority queue.
+    """
+    def __init__(self, nation):
+        super().__init__(nation)
+        self.events = []
+
+    def _schedule(self, event):
+        self.events.append(event)
+
+    def advance_time(self):
+        self.nation.advance_time()
+        event_log.tick = self.nation.current_time
+        removable_events = []
+        for event in list(self.events):
+            event.tick()
+            if event.is_finished():
+                removable_events.append(event)
+        for event in removable_events:
+            self.events.remove(event)
+            if type(event).__name__ == 'AttackEnemiesEvent':
+                self.attack_running = False
+                self.add_event(RestFromAttackEvent(event.combat))
+
+class CountDown(Event):
+    __slots__ = ("name", "runs")
+
+    def __init__(self, name, ticks, runs):
+        super().__init__()
+        self.name = name
+        self.ticks = ticks
+        self.runs = runs
+
+    def tick(self):
+        self.ticks -= 1
+        if self.ticks == 0:
+            self.runs.append(self.name)
+
+class Periodic(Event):
+    __slots__ = ("name", "runs")
+    period = 2
+
+    def __init__(self, name, runs):
+        super().__init__()
+        self.name = name
+        self.ticks = 5
+        self.runs = runs
+
+    def tick(self):
+        self.ticks -= 1
+        self.runs.append(self.name)
+
+def test_priority_queue_matches_polling_handler():
+    ticks = 3000
+    heap = build_simulation(seed=11, attack_force_rate=1.0)
+    polling = build_simulation(seed=11, attack_force_rate=1.0)
+    polling.event_handler = PollingEventHandler(polling.nation)
+    polling.add_default_events(polling.event_handler)
+
+    heap_rejected = heap.run_batch(ticks, scripted_actions(ticks))
+    polling_rejected = polling.run_batch(ticks, scripted_actions(ticks))
+
+    assert heap_rejected == polling_rejected
+    assert np.array_equal(heap.stats_cache.to_array(), polling.stats_cache.to_array())
+    assert np.array_equal(heap.battles.to_array(), polling.battles.to_array())
+
+def test_count_down_events_run_once_on_their_last_tick_in_insertion_order():
+    simulation = build_simulation(seed=0)
+    handler = EventHandler(simulation.nation)
+    runs = []
+    handler.add_event(CountDown("b", 3, runs))
+    handler.add_event(CountDown("a", 1, runs))
+    handler.add_event(CountDown("c", 3, runs))
+    assert [event.name for event in handler.current_events] == ["b", "a", "c"]
+    for _ in range(3):
+        handler.advance_time()
+        runs.append("|")
+    assert runs == ["a", "|", "|", "b", "c", "|"]
+    assert handler.current_events == []
+
+def test_periodic_events_run_every_period_until_finished():
+    simulation = build_simulation(seed=0)
+    handler = EventHandler(simulation.nation)
+    runs = []
+    event = Periodic("p", runs)
+    handler.add_event(event)
+    ticked_at = []
+    for _ in range(12):
+        handler.advance_time()
+        if runs and len(runs) > len(ticked_at):
+            ticked_at.append(simulation.nation.current_time)
+    start = simulation.nation.current_time - 12
+    assert ticked_at == [start + 2, start + 4, start + 6, start + 8, start + 10]
+    assert event.is_finished() and handler.current_events == []
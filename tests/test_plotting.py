@@ -0,0 +1,17 @@
+import re
+from conftest import build_simulation
+from historics import StatsCache
+
+def pages(pdf: bytes) -> int:
+    return len(re.findall(rb"/Type\s*/Page\b(?!s)", pdf))
+
+def test_historics_pdf_is_vector_unless_rasterized(tmp_path):
+    simulation = build_simulation(seed=0)
+    simulation.run_batch(500)
+    vector, raster = tmp_path / "vector.pdf", tmp_path / "raster.pdf"
+    simulation.stats_cache.plot_all_attributes(str(vector))
+    simulation.stats_cache.plot_all_attributes(str(raster), raster=True, workers=1)
+    vector, raster = vector.read_bytes(), raster.read_bytes()
+    assert pages(vector) == pages(raster) == len(StatsCache.COLUMNS)
+    assert b"/Subtype /Image" not in vector
+    assert b"/Subtype /Image" in raster
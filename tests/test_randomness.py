@@ -0,0 +1,55 @@
+import numpy as np
+from conftest import build_simulation, scripted_actions
+from randomness import BlockSampler, RandomStreams, SUBSYSTEMS
+
+def run(seed, ticks=3000, fast_forward=False):
+    simulation = build_simulation(seed=seed, attack_force_rate=1.0)
+    simulation.run_batch(ticks, scripted_actions(ticks), fast_forward=fast_forward)
+    return simulation
+
+def test_same_seed_replays_are_bit_identical():
+    for fast_forward in (False, True):
+        first, second = run(5, fast_forward=fast_forward), run(5, fast_forward=fast_forward)
+        assert np.array_equal(first.stats_cache.to_array(), second.stats_cache.to_array())
+        assert np.array_equal(first.battles.to_array(), second.battles.to_array())
+        assert first.seed == second.seed
+
+def test_different_seeds_give_different_runs():
+    assert not np.array_equal(run(5).stats_cache.to_array(), run(6).stats_cache.to_array())
+
+def test_block_sampler_draws_the_generator_sequence():
+    sampler = BlockSampler(np.random.default_rng(3), block_size=16)
+    uniforms = [sampler.random() for _ in range(40)]
+    normals = [sampler.normal(10, 2) for _ in range(40)]
+    reference = np.random.default_rng(3)
+    expected_uniforms = np.concatenate([reference.random(16) for _ in range(3)])[:40]
+    expected_normals = 10 + 2 * np.concatenate([reference.standard_normal(16) for _ in range(3)])[:40]
+    assert uniforms == expected_uniforms.tolist()
+    assert np.allclose(normals, expected_normals)
+
+def test_subsystem_streams_are_independent():
+    streams, other = RandomStreams(9), RandomStreams(9)
+    # Draws on one stream do not shift the numbers of another one.
+    for _ in range(5000):
+        other.stream("mines").random()
+    for name in SUBSYSTEMS:
+        if name != "mines":
+            assert [streams.stream(name).random() for _ in range(10)] == [other.stream(name).random() for _ in range(10)]
+    values = {name: [streams.stream(name).random() for _ in range(10)] for name in SUBSYSTEMS}
+    assert len({tuple(draws) for draws in values.values()}) == len(SUBSYSTEMS)
+
+def test_spawned_streams_are_reproducible_and_distinct():
+    first, second = RandomStreams(4).spawn(3), RandomStreams(4).spawn(3)
+    draws = [[child.stream("attacks").random() for _ in range(10)] for child in first]
+    assert draws == [[child.stream("attacks").random() for _ in range(10)] for child in second]
+    assert len({tuple(values) for values in draws}) == 3
+
+def test_forked_branches_draw_independent_numbers():
+    simulation = run(8, ticks=500)
+    shared = simulation.stats_cache.to_array().copy()
+    branches = simulation.fork(2)
+    for branch in branches:
+        branch.run_batch(2000)
+    first, second = (branch.stats_cache.to_array() for branch in branches)
+    assert np.array_equal(first[:, :500], shared) and np.array_equal(second[:, :500], shared)
+    assert not np.array_equal(first, second)
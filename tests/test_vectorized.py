@@ -0,0 +1,26 @@
+import numpy as np
+from conftest import MODELS_PATH
+from ensemble import run_ensemble
+from historics import StatsCache
+
+TICKS = 300
+COMPARED_TICKS = [0, 49, 149, 299]
+
+def test_vectorized_engine_matches_object_engine():
+    objects = run_ensemble(400, TICKS, models_path=MODELS_PATH, seed=1, workers=1)
+    vectorized = run_ensemble(10000, TICKS, models_path=MODELS_PATH, seed=2, engine="vectorized")
+    # The runs are seeded, so this is deterministic; the bound leaves room for
+    # the sampling noise of both ensembles, not for a biased engine.
+    object_mean, vectorized_mean = objects.mean[:, COMPARED_TICKS], vectorized.mean[:, COMPARED_TICKS]
+    standard_error = np.sqrt(objects.std[:, COMPARED_TICKS] ** 2 / objects.replicas
+                             + vectorized.std[:, COMPARED_TICKS] ** 2 / vectorized.replicas)
+    bound = 5 * standard_error + 1e-9 * (1 + np.abs(object_mean))
+    for metric, difference, metric_bound in zip(StatsCache.COLUMNS, np.abs(object_mean - vectorized_mean), bound):
+        assert np.all(difference <= metric_bound), metric
+
+def test_vectorized_engine_is_reproducible():
+    first = run_ensemble(500, TICKS, models_path=MODELS_PATH, seed=7, engine="vectorized")
+    second = run_ensemble(500, TICKS, models_path=MODELS_PATH, seed=7, engine="vectorized")
+    assert np.array_equal(first.mean, second.mean) and np.array_equal(first.quantile_values, second.quantile_values)
+    other = run_ensemble(500, TICKS, models_path=MODELS_PATH, seed=8, engine="vectorized")
+    assert not np.array_equal(first.mean, other.mean)
@@ -13,5 +13,15 @@ class EventAdditionError(Exception):
     def __init__(self, message) -> None:
         super().__init__(message)
 
+class ConfigError(Exception):
+    """
+    Custom exception to signal models' data that does not match the models.
+
+    Attributes:
+        message (str): Descriptive message for the error.
+    """
+    def __init__(self, message) -> None:
+        super().__init__(message)
+
 def get_buildings_count(nation: Nation, res: Resources, combat: Combat):
-    return nation.houses_count + len(res.gold_food_buildings) + combat.attack_buildings_count
\ No newline at end of file
+    return nation.houses_count + nation.buildings.count("Gold") + nation.buildings.count("Food") + combat.attack_buildings_count
\ No newline at end of file
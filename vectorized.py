@@ -0,0 +1,166 @@
+from __future__ import annotations
+import typing
+if typing.TYPE_CHECKING:
+    from models import Nation, Resources, Combat, ResearchAndDevelopment, EnemyNation
+import numpy as np
+from entities import animal_types
+from ensemble import EnsembleResult
+from historics import StatsCache
+
+class VectorizedEnsemble:
+    """
+    Advances many replicas of an idle simulation at once, holding their state
+    as NumPy arrays instead of one set of model objects per replica.
+
+    A tick applies, for every replica at the same time, what the object engine
+    does without player decisions: the enemy attack roll, the gold mine and
+    animal spawners, the update of the enemy's random values and the
+    resolution of the defense. Player actions are not supported.
+
+    Attributes:
+        replicas (int): Number of replicas.
+        gold_mines (np.ndarray): Gold mines per replica.
+        animals (np.ndarray): Animals per replica and type of `animal_types`, shape (replicas, types).
+        food_count (np.ndarray): Food per replica.
+        gold_count (np.ndarray): Gold per replica.
+        defense_units (np.ndarray): Defense units per replica.
+        attacks_risk_rate (np.ndarray): Enemy attack risk per replica.
+        gold_per_combat (np.ndarray): Enemy gold per combat per replica.
+        food_per_combat (np.ndarray): Enemy food per combat per replica.
+        units_per_combat (np.ndarray): Enemy units per combat per replica.
+        defense_wins (np.ndarray): Enemy attacks defended per replica.
+        defense_losts (np.ndarray): Enemy attacks not defended per replica.
+
+    Methods:
+        step(): Advance all the replicas by one tick.
+        metrics(): Get the current value of every StatsCache metric per replica.
+        run(ticks, quantiles): Run the replicas and aggregate their metrics per tick.
+    """
+    def __init__(self, nation: Nation, resources: Resources, combat: Combat, research_and_dev: ResearchAndDevelopment,
+                 enemy_nation: EnemyNation, replicas: int, seed=None):
+        self.nation = nation
+        self.combat = combat
+        self.enemy_nation = enemy_nation
+        self.replicas = replicas
+        self.rng = np.random.default_rng(seed)
+
+        self.gold_mines = np.full(replicas, nation.gold_mines, dtype=np.int64)
+        self.animals = np.zeros((replicas, len(animal_types)), dtype=np.int64)
+        for index, name in enumerate(animal_types):
+            self.animals[:, index] = nation.animals.count(name)
+        self.food_count = np.full(replicas, resources.food_count, dtype=np.float64)
+        self.gold_count = np.full(replicas, resources.gold_count, dtype=np.float64)
+        self.defense_units = np.full(replicas, combat.defense_units_count, dtype=np.int64)
+        self.attacks_risk_rate = np.full(replicas, enemy_nation.attacks_risk_rate, dtype=np.float64)
+        self.gold_per_combat = np.full(replicas, enemy_nation.gold_per_combat, dtype=np.float64)
+        self.food_per_combat = np.full(replicas, enemy_nation.food_per_combat, dtype=np.float64)
+        self.units_per_combat = np.full(replicas, enemy_nation.units_per_combat, dtype=np.float64)
+        self.defense_wins = np.zeros(replicas, dtype=np.int64)
+        self.defense_losts = np.zeros(replicas, dtype=np.int64)
+
+        # Metrics that idle replicas never change.
+        self.constants = {
+            "not_worked_space": nation.not_worked_space,
+            "used_space": nation.used_space,
+            "roads_count": nation.roads_count,
+            "population_count": nation.population_count,
+            "busy_population_count": nation.current_busy_population_count,
+            "houses_count": nation.houses_count,
+            "attack_units": combat.attack_units_count,
+            "attack_force_rate": combat.attack_force_rate,
+            "resting": combat.resting,
+            # Idle replicas never attack.
+            "attack_wins": 0,
+            "attack_losts": 0,
+        }
+
+    def step(self):
+        rng = self.rng
+        n = self.replicas
+        attacked = rng.random(n) < self.attacks_risk_rate
+
+        # SpawnMineEvent and SpawnAnimalEvent
+        self.gold_mines += rng.random(n) >= self.nation.gold_mine_spawn_rate
+        spawned = rng.random(n) >= self.nation.animal_spawn_rate
+        if self.nation.max_animals is not None:
+            spawned &= self.animals.sum(axis=1) < self.nation.max_animals
+        spawned = np.flatnonzero(spawned)
+        self.animals[spawned, rng.integers(0, len(animal_types), spawned.size)] += 1
+
+        # UpdateRandomValuesEvent
+        enemy = self.enemy_nation
+        starving = (self.food_count <= 0) | (self.gold_count <= 0)
+        self.attacks_risk_rate = np.where(
+            starving,
+            self.attacks_risk_rate + 0.01,
+            np.maximum(0.01, self.attacks_risk_rate - (self.food_count + self.gold_count) * 0.0001),
+        )
+        self.food_per_combat = np.trunc(rng.normal(enemy.food_per_combat_mean, enemy.food_per_combat_std, n))
+        self.gold_per_combat = np.trunc(rng.normal(enemy.gold_per_combat_mean, enemy.gold_per_combat_std, n))
+        self.units_per_combat = np.trunc(rng.normal(enemy.units_per_combat_mean, enemy.units_per_combat_std, n))
+
+        # DefendFromEnemiesEvent
+        defended = attacked & (self.defense_units >= enemy.attack_coefficient)
+        lost = attacked & ~defended
+        self.defense_wins += defended
+        self.defense_losts += lost
+        if defended.any():
+            high = self.defense_units[defended] - 1
+            survivors = rng.integers(1, np.maximum(high, 2))
+            self.defense_units[defended] = np.where(high > 1, survivors, 1)
+        if lost.any():
+            self.defense_units[lost] = 0
+            lost_food = np.minimum(self.food_count[lost], self.food_per_combat[lost])
+            lost_gold = np.minimum(self.gold_count[lost], self.gold_per_combat[lost])
+            self.food_count[lost] -= lost_food
+            self.gold_count[lost] -= lost_gold
+
+    def metrics(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: The value of every column of `StatsCache` per replica, shape (columns, replicas).
+        """
+        current = {
+            "animals": self.animals.sum(axis=1),
+            "gold_mines": self.gold_mines,
+            "food_count": self.food_count,
+            "gold_count": self.gold_count,
+            "defense_units": self.defense_units,
+            "attack_risk_rate": self.attacks_risk_rate,
+            "gold_per_combat": self.gold_per_combat,
+            "food_per_combat": self.food_per_combat,
+            "units_per_combat": self.units_per_combat,
+            "defense_wins": self.defense_wins,
+            "defense_losts": self.defense_losts,
+        }
+        values = np.empty((len(StatsCache.COLUMNS), self.replicas), dtype=np.float64)
+        for index, name in enumerate(StatsCache.COLUMNS):
+            values[index] = current[name] if name in current else self.constants[name]
+        return values
+
+    def run(self, ticks: int, quantiles: tuple = (0.05, 0.5, 0.95)) -> EnsembleResult:
+        """
+        Runs all the replicas for a number of ticks, aggregating the metrics of
+        each tick as soon as it is computed, so memory does not grow with the
+        number of replicas times the number of ticks.
+
+        Returns:
+            EnsembleResult: The per-tick statistics, comparable with `run_ensemble`.
+        """
+        mean = np.empty((len(StatsCache.COLUMNS), ticks))
+        std = np.empty((len(StatsCache.COLUMNS), ticks))
+        quantile_values = np.empty((len(quantiles), len(StatsCache.COLUMNS), ticks))
+        for tick in range(ticks):
+            self.step()
+            values = self.metrics()
+            mean[:, tick] = values.mean(axis=1)
+            std[:, tick] = values.std(axis=1)
+            quantile_values[:, :, tick] = np.quantile(values, quantiles, axis=1)
+        return EnsembleResult(
+            replicas=self.replicas,
+            metrics=StatsCache.COLUMNS,
+            quantiles=tuple(quantiles),
+            mean=mean,
+            std=std,
+            quantile_values=quantile_values,
+        )